@@ -0,0 +1,8 @@
+"""
+Benchmark of the time taken to import ndx_photostim.
+"""
+
+
+def timeraw_import_ndx_photostim():
+    # run in a fresh interpreter, with pynwb imported beforehand so that only the extension itself is timed
+    return "import ndx_photostim", "import pynwb"
@@ -0,0 +1,71 @@
+"""
+Benchmarks of NWBHDF5IO write/read roundtrips of photostim files.
+"""
+import os
+import shutil
+import tempfile
+
+from pynwb import NWBHDF5IO
+
+from .common import MASK_WIDTHS, NUM_EVENTS, make_nwbfile, make_pattern, make_series
+
+
+class _RoundtripSuite:
+    # an NWBFile can only be written once, so each timed write gets a new file from 'setup'
+    number = 1
+    timeout = 900
+
+    def _setup(self, num_events, width):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'roundtrip.nwb')
+        self.nwbfile = self.make_nwbfile(num_events, width)
+        with NWBHDF5IO(os.path.join(self.dir, 'read.nwb'), 'w') as io:
+            io.write(self.make_nwbfile(num_events, width))
+
+    @staticmethod
+    def make_nwbfile(num_events, width):
+        nwbfile = make_nwbfile()
+        nwbfile.add_stimulus(make_series(num_events, make_pattern(width, image_mask=True)))
+        return nwbfile
+
+    def teardown(self, *params):
+        shutil.rmtree(self.dir)
+
+    def write(self):
+        with NWBHDF5IO(self.path, 'w') as io:
+            io.write(self.nwbfile)
+
+    def read(self):
+        with NWBHDF5IO(os.path.join(self.dir, 'read.nwb'), 'r') as io:
+            series = io.read().stimulus['series']
+            series.data[:]
+            series.timestamps[:]
+            series.pattern.image_mask_roi[:]
+
+
+class EventsRoundtripSuite(_RoundtripSuite):
+    params = NUM_EVENTS
+    param_names = ['num_events']
+
+    def setup(self, num_events):
+        self._setup(num_events, width=256)
+
+    def time_write(self, num_events):
+        self.write()
+
+    def time_read(self, num_events):
+        self.read()
+
+
+class MaskRoundtripSuite(_RoundtripSuite):
+    params = MASK_WIDTHS
+    param_names = ['width']
+
+    def setup(self, width):
+        self._setup(1000, width)
+
+    def time_write(self, width):
+        self.write()
+
+    def time_read(self, width):
+        self.read()
@@ -0,0 +1,31 @@
+"""
+Benchmarks of HolographicPattern mask conversions.
+"""
+from ndx_photostim import HolographicPattern
+
+from .common import MASK_WIDTHS, make_pattern
+
+
+class PixelToImageMaskSuite:
+    params = (MASK_WIDTHS, [10, 100, 1000])
+    param_names = ['width', 'num_rois']
+
+    def setup(self, width, num_rois):
+        self.pattern = make_pattern(width, num_rois)
+
+    def time_pixel_to_image_mask_roi(self, width, num_rois):
+        self.pattern.pixel_to_image_mask_roi()
+
+    def peakmem_pixel_to_image_mask_roi(self, width, num_rois):
+        self.pattern.pixel_to_image_mask_roi()
+
+
+class ImageToPixelSuite:
+    params = (MASK_WIDTHS, [False, True])
+    param_names = ['width', 'centers']
+
+    def setup(self, width, centers):
+        self.mask = make_pattern(width, num_rois=width // 4).pixel_to_image_mask_roi()
+
+    def time_image_to_pixel(self, width, centers):
+        HolographicPattern.image_to_pixel(self.mask, centers=centers)
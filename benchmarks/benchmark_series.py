@@ -0,0 +1,53 @@
+"""
+Benchmarks of PhotostimulationSeries construction, additions and conversions.
+"""
+import numpy as np
+
+from ndx_photostim import PhotostimulationSeries
+
+from .common import NUM_EVENTS, make_events, make_pattern, make_series
+
+
+class SeriesSuite:
+    params = (NUM_EVENTS, ['interval', 'series'])
+    param_names = ['num_events', 'format']
+    timeout = 600
+
+    def setup(self, num_events, format):
+        self.pattern = make_pattern()
+        self.data, self.timestamps = make_events(num_events, format)
+        self.series = PhotostimulationSeries(name='series', format=format, pattern=self.pattern, data=self.data,
+                                             timestamps=self.timestamps, stim_duration=0.1)
+
+    def time_construct(self, num_events, format):
+        # includes the validation of 'data' and 'timestamps'
+        PhotostimulationSeries(name='series', format=format, pattern=self.pattern, data=self.data,
+                               timestamps=self.timestamps, stim_duration=0.1)
+
+    def time_to_dataframe(self, num_events, format):
+        self.series.to_dataframe()
+
+    def time_get_intervals(self, num_events, format):
+        self.series.get_intervals()
+
+    def time_get_events(self, num_events, format):
+        self.series.get_events(num_events / 4, num_events / 4 + 10)
+
+
+class AddOnsetSuite:
+    params = NUM_EVENTS
+    param_names = ['num_events']
+    timeout = 600
+    # onsets must be added after the last presentation, so each run adds them to a fresh series
+    number = 1
+
+    def setup(self, num_events):
+        self.series = make_series(100, make_pattern())
+        self.onsets = np.arange(num_events // 2) + 200.
+
+    def time_add_onsets(self, num_events):
+        self.series.add_onsets(self.onsets)
+
+    def time_add_onset_1000_calls(self, num_events):
+        for onset in self.onsets[:1000]:
+            self.series.add_onset(onset)
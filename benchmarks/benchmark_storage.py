@@ -0,0 +1,103 @@
+"""
+Compare the file size and read throughput of the ndx-photostim storage profiles.
+
+Written in the asv (airspeed velocity) benchmark format: 'track_*' methods report the file size and 'time_*' methods
+time reads of the written datasets. Each benchmark can also be run without asv, e.g.
+
+    python -c "from benchmarks.benchmark_storage import report; report()"
+"""
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+from dateutil.tz import tzlocal
+from pynwb import NWBFile, NWBHDF5IO
+
+from ndx_photostim import PhotostimulationMethod, HolographicPattern, PhotostimulationSeries, PhotostimulationTable
+
+PROFILES = [None, 'archive', 'fast', 'scan']
+NUM_ONSETS = 200000
+MASK_DIMENSION = [512, 512, 10]
+NUM_TARGETS = 500
+
+
+def write_file(path, profile):
+    """
+    Write a file holding a 3D pattern, a series of 'NUM_ONSETS' presentations and the table of the series, stored
+    with 'profile'.
+    """
+    rng = np.random.default_rng(0)
+    nwbfile = NWBFile(session_description='storage benchmark', identifier='storage benchmark',
+                      session_start_time=datetime.now(tzlocal()))
+    pattern = HolographicPattern(name='pattern', pixel_roi=rng.uniform(0, 512, (NUM_TARGETS, 3)) * [1, 1, 10 / 512],
+                                 roi_size=8, dimension=MASK_DIMENSION, method=PhotostimulationMethod(name='method'),
+                                 storage_profile=profile)
+    mask = pattern.pixel_to_image_mask_roi()
+    pattern = HolographicPattern(name='pattern', image_mask_roi=mask, method=PhotostimulationMethod(name='method'),
+                                 storage_profile=profile)
+    series = PhotostimulationSeries(name='series', format='interval', pattern=pattern, stim_duration=0.01,
+                                    storage_profile=profile)
+    # one onset every 18 ms over an hour, jittered by less than the gap between presentations
+    series.add_onsets(np.arange(NUM_ONSETS) * 0.018 + rng.uniform(0, 0.005, NUM_ONSETS))
+    nwbfile.add_stimulus(series)
+    table = PhotostimulationTable(name='table', description='storage benchmark', storage_profile=profile)
+    table.add_series(series)
+    nwbfile.add_acquisition(table)
+
+    with NWBHDF5IO(path, 'w') as io:
+        io.write(nwbfile)
+
+
+class StorageProfileSuite:
+    params = PROFILES
+    param_names = ['profile']
+
+    def setup_cache(self):
+        paths = dict()
+        for profile in PROFILES:
+            paths[profile] = os.path.join(tempfile.mkdtemp(), f'{profile}.nwb')
+            write_file(paths[profile], profile)
+        return paths
+
+    def setup(self, paths, profile):
+        self.io = NWBHDF5IO(paths[profile], 'r')
+        self.series = self.io.read().stimulus['series']
+
+    def teardown(self, paths, profile):
+        self.io.close()
+
+    def track_file_size(self, paths, profile):
+        return os.path.getsize(paths[profile])
+    track_file_size.unit = 'bytes'
+
+    def time_read_timestamps(self, paths, profile):
+        self.series.timestamps[:]
+
+    def time_read_timestamps_window(self, paths, profile):
+        self.series.timestamps[NUM_ONSETS:NUM_ONSETS + 1000]
+
+    def time_read_mask(self, paths, profile):
+        self.series.pattern.image_mask_roi[:]
+
+    def time_read_mask_plane(self, paths, profile):
+        self.series.pattern.image_mask_roi[:, :, 5]
+
+
+def report():
+    """
+    Print the file size and read times of each storage profile.
+    """
+    suite = StorageProfileSuite()
+    paths = suite.setup_cache()
+    for profile in PROFILES:
+        suite.setup(paths, profile)
+        times = dict()
+        for name in ('time_read_timestamps', 'time_read_timestamps_window', 'time_read_mask', 'time_read_mask_plane'):
+            start = time.perf_counter()
+            getattr(suite, name)(paths, profile)
+            times[name[len('time_read_'):]] = time.perf_counter() - start
+        suite.teardown(paths, profile)
+        print(f"{str(profile):>8}: {suite.track_file_size(paths, profile) / 2 ** 20:8.2f} MiB  " +
+              "  ".join(f"{name} {seconds * 1000:7.2f} ms" for name, seconds in times.items()))
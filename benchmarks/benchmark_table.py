@@ -0,0 +1,26 @@
+"""
+Benchmarks of PhotostimulationTable additions and queries.
+"""
+from ndx_photostim import PhotostimulationTable
+
+from .common import make_pattern, make_series
+
+
+class TableSuite:
+    # constructing series is dominated by hdmf field validation, so the table sizes are kept small
+    params = ([10, 50], [10 ** 2, 10 ** 4])
+    param_names = ['num_series', 'num_events']
+    timeout = 600
+
+    def setup(self, num_series, num_events):
+        pattern = make_pattern()
+        self.series = [make_series(num_events, pattern, name=f'series_{i}') for i in range(num_series)]
+        self.table = PhotostimulationTable(name='table', description='benchmark table')
+        self.table.add_series(self.series)
+
+    def time_add_series(self, num_series, num_events):
+        PhotostimulationTable(name='table', description='benchmark table').add_series(self.series)
+
+    def time_get_rows_at(self, num_series, num_events):
+        # the first query builds the interval index
+        self.table.get_rows_at(num_events / 2)
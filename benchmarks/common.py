@@ -0,0 +1,60 @@
+"""
+Helpers shared by the ndx-photostim benchmarks.
+"""
+from datetime import datetime
+
+import numpy as np
+from dateutil.tz import tzlocal
+from pynwb import NWBFile
+
+from ndx_photostim import PhotostimulationMethod, HolographicPattern, PhotostimulationSeries
+
+# number of events (entries of 'data') and mask widths (in pixels) the benchmarks are parameterized over
+NUM_EVENTS = [10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+MASK_WIDTHS = [64, 256, 1024, 2048]
+
+
+def make_pattern(width=64, num_rois=20, image_mask=False, seed=0):
+    """
+    Return a 2D pattern of 'num_rois' circular ROIs on a 'width' x 'width' frame, defined with 'pixel_roi' (or with
+    the equivalent 'image_mask_roi', if 'image_mask' is True).
+    """
+    rng = np.random.default_rng(seed)
+    pattern = HolographicPattern(name='pattern', pixel_roi=rng.uniform(0, width, (num_rois, 2)), roi_size=8,
+                                 dimension=[width, width], method=PhotostimulationMethod(name='method'))
+    if not image_mask:
+        return pattern
+    return HolographicPattern(name='pattern', image_mask_roi=pattern.pixel_to_image_mask_roi(),
+                              method=PhotostimulationMethod(name='method'))
+
+
+def make_events(num_events, format='interval', seed=0):
+    """
+    Return 'data' and 'timestamps' holding 'num_events' entries of a series with the given format. 'interval'
+    presentations last 0.1 s and do not overlap.
+    """
+    rng = np.random.default_rng(seed)
+    if format == 'interval':
+        # one onset every 2 s, jittered by less than the gap between presentations so that they do not overlap
+        onsets = np.arange(num_events // 2) * 2. + rng.uniform(0, 1, num_events // 2)
+        timestamps = np.empty(2 * len(onsets))
+        timestamps[0::2] = onsets
+        timestamps[1::2] = onsets + 0.1
+        data = np.tile(np.array([1, -1], dtype=np.int8), len(onsets))
+        return data, timestamps
+    data = (rng.random(num_events) < 0.1).astype(np.int8)
+    return data, np.arange(num_events) / 30.
+
+
+def make_series(num_events, pattern, format='interval', name='series'):
+    """
+    Return a series with 'num_events' entries presenting 'pattern'.
+    """
+    data, timestamps = make_events(num_events, format)
+    return PhotostimulationSeries(name=name, format=format, pattern=pattern, data=data, timestamps=timestamps,
+                                  stim_duration=0.1)
+
+
+def make_nwbfile():
+    return NWBFile(session_description='ndx-photostim benchmark', identifier='ndx-photostim benchmark',
+                   session_start_time=datetime.now(tzlocal()))
@@ -1,5 +1,6 @@
 import os
-from pynwb import load_namespaces
+
+from .namespace_cache import load_namespaces
 
 # Set path of the namespace.yaml file to the expected install location
 ndx_photostim_specpath = os.path.join(
@@ -18,7 +19,7 @@ if not os.path.exists(ndx_photostim_specpath):
         'ndx-photostim.namespace.yaml'
     ))
 
-# Load the namespace
+# Load the namespace, reusing the parsed spec files cached by previous imports when the spec is unchanged
 load_namespaces(ndx_photostim_specpath)
 
 # them accessible at the package level
@@ -27,3 +28,10 @@ load_namespaces(ndx_photostim_specpath)
 from . import io as __io  # noqa: E402,F401
 from .photostim import SpatialLightModulator, Laser, PhotostimulationMethod, HolographicPattern, \
                              PhotostimulationSeries, PhotostimulationTable
+from .alignment import extract_peristim_windows  # noqa: E402,F401
+from .masks import render_masks  # noqa: E402,F401
+from .registry import MethodRegistry, PatternRegistry  # noqa: E402,F401
+from .instrumentation import Instrumentation, instrument_from_environment  # noqa: E402,F401
+
+# Instrument the classes for the whole session if requested with the NDX_PHOTOSTIM_INSTRUMENT environment variable
+instrument_from_environment()
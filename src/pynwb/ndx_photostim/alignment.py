@@ -0,0 +1,104 @@
+import numpy as np
+
+from .search import rate_search_sorted
+
+# default upper bound on the number of frames read at once from response data that is not held in memory
+DEFAULT_CHUNK_FRAMES = 4096
+
+
+def _frame_rate(response):
+    """
+    Return the frame rate of 'response', estimated from the median frame interval if it has timestamps.
+    """
+    if response.timestamps is None:
+        return response.rate
+    timestamps = np.asarray(response.timestamps[:], dtype=np.float64)
+    if len(timestamps) < 2:
+        raise ValueError(f"Cannot estimate the frame rate of '{response.name}' from fewer than two timestamps.")
+    return 1 / np.median(np.diff(timestamps))
+
+
+def _onset_frames(response, onsets):
+    """
+    Return the index of the first frame of 'response' at or after each time in 'onsets'.
+    """
+    num_frames = len(response.data)
+    if response.timestamps is None:
+        return rate_search_sorted(response.starting_time, response.rate, num_frames, onsets)
+    timestamps = np.asarray(response.timestamps[:], dtype=np.float64)
+    return np.searchsorted(timestamps, onsets, side='left')
+
+
+def _gather_windows(block, block_start, starts, window_length, num_frames, out):
+    """
+    Copy the windows of 'window_length' frames starting at the frames 'starts' from 'block', which holds the frames
+    from 'block_start' on, into 'out'. Frames outside [0, num_frames) are left as NaN.
+    """
+    local = starts - block_start
+    inside = (starts >= 0) & (starts + window_length <= num_frames)
+    if inside.any():
+        # windows entirely within the data are gathered from a strided view, without building an index array
+        windows = np.lib.stride_tricks.sliding_window_view(block, window_length, axis=0)
+        out[inside] = np.moveaxis(windows[local[inside]], -1, 1)
+
+    if not inside.all():
+        frames = starts[~inside, None] + np.arange(window_length)
+        valid = (frames >= 0) & (frames < num_frames)
+        partial = np.full((len(frames), window_length) + block.shape[1:], np.nan, dtype=out.dtype)
+        partial[valid] = block[frames[valid] - block_start]
+        out[~inside] = partial
+
+
+def extract_peristim_windows(series, response, pre, post, chunk_frames=None):
+    """
+    Align the frames of 'response' (e.g., a RoiResponseSeries or TwoPhotonSeries) to the onsets of the presentations
+    of the PhotostimulationSeries 'series'. Each onset is mapped to the first frame at or after it by binary search,
+    and the window from 'pre' seconds before to 'post' seconds after that frame is gathered for every onset at once.
+
+    Returns the array of windows, of shape (num_onsets, num_window_frames, ...) where the trailing axes are those of a
+    frame of 'response', and the time (in seconds) of each window frame relative to the onset frame. Frames before
+    the start or after the end of 'response' are NaN.
+
+    Response data held in memory is gathered in a single pass. Other data (e.g., h5py datasets) is read in blocks of
+    at most 'chunk_frames' frames (or one window, if longer), so that only the frames around the onsets are loaded.
+    """
+    if pre < 0 or post < 0:
+        raise ValueError("'pre' and 'post' must be non-negative.")
+
+    rate = _frame_rate(response)
+    num_pre = int(round(pre * rate))
+    window_length = num_pre + int(round(post * rate))
+    times = np.arange(-num_pre, window_length - num_pre) / rate
+
+    data = response.data
+    if isinstance(data, (list, tuple)):
+        data = np.asarray(data)
+    num_frames = len(data)
+    onsets = series.get_intervals()[:, 0]
+    starts = np.asarray(_onset_frames(response, onsets), dtype=np.intp) - num_pre
+
+    dtype = np.result_type(data.dtype, np.float32)
+    windows = np.full((len(starts), window_length) + tuple(data.shape[1:]), np.nan, dtype=dtype)
+    if len(starts) == 0 or window_length == 0:
+        return windows, times
+
+    if isinstance(data, np.ndarray):
+        _gather_windows(data, 0, starts, window_length, num_frames, windows)
+        return windows, times
+
+    # read the frames around the onsets in blocks, each covering the windows of a run of consecutive onsets
+    chunk_frames = max(chunk_frames or DEFAULT_CHUNK_FRAMES, window_length)
+    order = np.argsort(starts, kind='stable')
+    sorted_starts = starts[order]
+    i = 0
+    while i < len(order):
+        j = np.searchsorted(sorted_starts, sorted_starts[i] + chunk_frames - window_length, side='right')
+        block_start = min(max(sorted_starts[i], 0), num_frames)
+        block_stop = max(min(sorted_starts[j - 1] + window_length, num_frames), block_start)
+        block = np.asarray(data[block_start:block_stop])
+
+        block_windows = np.empty((j - i,) + windows.shape[1:], dtype=dtype)
+        _gather_windows(block, block_start, sorted_starts[i:j], window_length, num_frames, block_windows)
+        windows[order[i:j]] = block_windows
+        i = j
+    return windows, times
@@ -0,0 +1,64 @@
+import numpy as np
+
+
+class GrowableArray:
+    """
+    Typed array supporting amortized O(1) appends along its first axis. Each entry is a value, or an array of shape
+    'row_shape' (e.g., (2,) for rows of [start, stop]). Values are stored in a numpy buffer whose capacity doubles
+    when full, and 'view' exposes the filled part of the buffer without copying.
+    """
+
+    def __init__(self, data=(), dtype=float, capacity=16, row_shape=()):
+        self._row_shape = tuple(row_shape)
+        data = np.array(data, dtype=dtype).reshape((-1,) + self._row_shape)
+        self._buffer = np.empty((max(capacity, len(data)),) + self._row_shape, dtype=dtype)
+        self._buffer[:len(data)] = data
+        self._size = len(data)
+
+    def __len__(self):
+        return self._size
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None or np.dtype(dtype) == self.dtype:
+            return self.view()
+        return self.view().astype(dtype)
+
+    @property
+    def dtype(self):
+        return self._buffer.dtype
+
+    def view(self):
+        """
+        Return a numpy view of the values in the array. The view does not include values appended after it is taken.
+        """
+        return self._buffer[:self._size]
+
+    def _reserve(self, size):
+        """
+        Grow the buffer, doubling its capacity until it can hold 'size' values.
+        """
+        capacity = len(self._buffer)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity = max(2 * capacity, 1)
+        buffer = np.empty((capacity,) + self._row_shape, dtype=self._buffer.dtype)
+        buffer[:self._size] = self.view()
+        self._buffer = buffer
+
+    def append(self, value):
+        """
+        Append a single value.
+        """
+        self._reserve(self._size + 1)
+        self._buffer[self._size] = value
+        self._size += 1
+
+    def extend(self, values):
+        """
+        Append all values in 'values' in a single copy.
+        """
+        values = np.asarray(values, dtype=self._buffer.dtype).reshape((-1,) + self._row_shape)
+        self._reserve(self._size + len(values))
+        self._buffer[self._size:self._size + len(values)] = values
+        self._size += len(values)
@@ -0,0 +1,34 @@
+import hashlib
+
+import numpy as np
+
+
+def content_digest(*values):
+    """
+    Return the SHA-256 hex digest of 'values', each of which is None, a string, or a number or array of numbers (in
+    memory or in a file). Numbers are hashed by value, so e.g. an integer and a float mask with the same values have
+    the same digest.
+    """
+    digest = hashlib.sha256()
+    for value in values:
+        _update(digest, value)
+    return digest.hexdigest()
+
+
+def _update(digest, value):
+    if value is None:
+        digest.update(b'N;')
+        return
+    if isinstance(value, str):
+        encoded = value.encode('utf-8')
+        digest.update(b'S%d:' % len(encoded) + encoded)
+        return
+
+    array = np.asarray(value)
+    if array.dtype.kind in 'biuf':
+        array = np.ascontiguousarray(array, dtype=np.float64)
+        digest.update(b'A' + repr(array.shape).encode('ascii') + b':')
+        digest.update(array.tobytes())
+    else:
+        encoded = repr(array.tolist()).encode('utf-8')
+        digest.update(b'R%d:' % len(encoded) + encoded)
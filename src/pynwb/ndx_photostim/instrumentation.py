@@ -0,0 +1,184 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from .photostim import HolographicPattern, PhotostimulationSeries, PhotostimulationTable
+
+# setting this environment variable instruments the classes from import until exit, when the report is written as
+# JSON to the path it holds (or to stderr, if it is '1' or 'true')
+ENV_VAR = 'NDX_PHOTOSTIM_INSTRUMENT'
+
+INSTRUMENTED_CLASSES = (HolographicPattern, PhotostimulationSeries, PhotostimulationTable)
+
+
+def _public_methods(cls):
+    """
+    Yield the name and class attribute of the constructor and each public method defined by 'cls' (properties are
+    skipped).
+    """
+    for name, attr in vars(cls).items():
+        if name != '__init__' and name.startswith('_'):
+            continue
+        if isinstance(attr, (staticmethod, classmethod)) or callable(attr):
+            yield name, attr
+
+
+class Instrumentation:
+    """
+    Records the number of calls, cumulative wall time and bytes allocated (the increase of the traced memory peak
+    during each call, measured with tracemalloc) of the constructor and public methods of HolographicPattern,
+    PhotostimulationSeries and PhotostimulationTable.
+
+    The methods are only replaced by recording wrappers while the instrumentation is enabled, so the classes run
+    without any overhead otherwise. Use it as a context manager, e.g.
+
+        with Instrumentation() as instrumentation:
+            ...
+        print(instrumentation.to_json())
+
+    Times and bytes of a method include those of the instrumented methods it calls. Memory tracing slows down all
+    allocations, so it can be turned off with 'trace_memory=False' when only times are needed.
+    """
+
+    __active = None
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stats = dict()
+        self.__originals = []
+        self.__peaks = []
+        self.__started_tracing = False
+
+    @property
+    def enabled(self):
+        return Instrumentation.__active is self
+
+    def enable(self):
+        """
+        Replace the methods of the instrumented classes by recording wrappers.
+        """
+        if Instrumentation.__active is not None:
+            raise ValueError("Another Instrumentation is already enabled.")
+        Instrumentation.__active = self
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.__started_tracing = True
+        for cls in INSTRUMENTED_CLASSES:
+            for name, attr in list(_public_methods(cls)):
+                self.__originals.append((cls, name, attr))
+                setattr(cls, name, self.__wrap(f'{cls.__name__}.{name}', attr))
+        return self
+
+    def disable(self):
+        """
+        Restore the original methods of the instrumented classes.
+        """
+        if not self.enabled:
+            return
+        for cls, name, attr in reversed(self.__originals):
+            setattr(cls, name, attr)
+        self.__originals = []
+        if self.__started_tracing:
+            tracemalloc.stop()
+            self.__started_tracing = False
+        Instrumentation.__active = None
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disable()
+
+    def __wrap(self, key, attr):
+        if isinstance(attr, (staticmethod, classmethod)):
+            return type(attr)(self.__wrap(key, attr.__func__))
+
+        @functools.wraps(attr)
+        def wrapper(*args, **kwargs):
+            start_bytes = self.__enter_call()
+            start = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                self.__record(key, time.perf_counter() - start, self.__exit_call(start_bytes))
+
+        return wrapper
+
+    def __enter_call(self):
+        if not tracemalloc.is_tracing():
+            return None
+        current, peak = tracemalloc.get_traced_memory()
+        if self.__peaks:
+            # resetting the peak for this call would lose the peak reached so far by the enclosing call
+            self.__peaks[-1] = max(self.__peaks[-1], peak)
+        self.__peaks.append(current)
+        tracemalloc.reset_peak()
+        return current
+
+    def __exit_call(self, start_bytes):
+        if start_bytes is None or not tracemalloc.is_tracing():
+            return 0
+        peak = max(tracemalloc.get_traced_memory()[1], self.__peaks.pop())
+        if self.__peaks:
+            self.__peaks[-1] = max(self.__peaks[-1], peak)
+        return peak - start_bytes
+
+    def __record(self, key, seconds, allocated):
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = {'calls': 0, 'wall_time': 0., 'allocated_bytes': 0, 'max_allocated_bytes': 0}
+        stats['calls'] += 1
+        stats['wall_time'] += seconds
+        stats['allocated_bytes'] += allocated
+        stats['max_allocated_bytes'] = max(stats['max_allocated_bytes'], allocated)
+
+    def reset(self):
+        """
+        Discard the recorded statistics.
+        """
+        self.stats = dict()
+
+    def report(self):
+        """
+        Return the recorded statistics of each called method, keyed by 'Class.method' and sorted by decreasing wall
+        time. 'wall_time' is in seconds; 'allocated_bytes' is summed over calls and 'max_allocated_bytes' is the most
+        allocated by a single call (both 0 without memory tracing).
+        """
+        return dict(sorted(self.stats.items(), key=lambda item: item[1]['wall_time'], reverse=True))
+
+    def to_json(self, path=None):
+        """
+        Return the report as a JSON string, also writing it to 'path' if given.
+        """
+        report = json.dumps(self.report(), indent=2)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(report)
+        return report
+
+
+def instrument_from_environment():
+    """
+    Enable an Instrumentation if the environment variable NDX_PHOTOSTIM_INSTRUMENT is set, writing its report when
+    the interpreter exits. Returns the Instrumentation, or None if the variable is not set.
+    """
+    target = os.environ.get(ENV_VAR, '')
+    if target.lower() in ('', '0', 'false'):
+        return None
+
+    instrumentation = Instrumentation().enable()
+
+    def write_report():
+        instrumentation.disable()
+        if target.lower() in ('1', 'true'):
+            print(instrumentation.to_json(), file=sys.stderr)
+        else:
+            instrumentation.to_json(target)
+
+    atexit.register(write_report)
+    return instrumentation
@@ -0,0 +1,127 @@
+import numpy as np
+
+# sets of at most this many intervals are stored in a leaf and scanned, rather than split into further nodes
+_LEAF_SIZE = 32
+
+
+class _Leaf:
+    """
+    Leaf of a centered interval tree, holding a small set of intervals that are scanned on every query.
+    """
+
+    __slots__ = ('starts', 'stops', 'labels')
+
+    def __init__(self, starts, stops, labels):
+        self.starts = starts
+        self.stops = stops
+        self.labels = labels
+
+
+class _Node:
+    """
+    Node of a centered interval tree, holding the intervals that contain its center sorted by start and by stop, and
+    the subtrees of the intervals entirely before ('left') and after ('right') its center.
+    """
+
+    __slots__ = ('center', 'starts', 'start_labels', 'stops', 'stop_labels', 'left', 'right')
+
+    def __init__(self, center, starts, stops, labels, left, right):
+        self.center = center
+        by_start = np.argsort(starts, kind='stable')
+        by_stop = np.argsort(stops, kind='stable')
+        self.starts, self.start_labels = starts[by_start], labels[by_start]
+        self.stops, self.stop_labels = stops[by_stop], labels[by_stop]
+        self.left = left
+        self.right = right
+
+
+class IntervalTree:
+    """
+    Static centered interval tree over half-open intervals [start, stop), each with an integer label. Point queries
+    return the labels of the intervals containing a time, and range queries the labels of the intervals overlapping
+    a time range, in O(log N + k) time for k matching intervals (with small sets of intervals scanned in leaves).
+    Empty intervals (start >= stop) are ignored.
+    """
+
+    def __init__(self, starts, stops, labels):
+        starts = np.asarray(starts, dtype=np.float64).ravel()
+        stops = np.asarray(stops, dtype=np.float64).ravel()
+        labels = np.asarray(labels, dtype=np.intp).ravel()
+        if not len(starts) == len(stops) == len(labels):
+            raise ValueError("'starts', 'stops' and 'labels' need to be the same length.")
+
+        keep = starts < stops
+        self.num_intervals = int(keep.sum())
+        self.root = self.__build(starts[keep], stops[keep], labels[keep])
+
+    def __len__(self):
+        return self.num_intervals
+
+    def __build(self, starts, stops, labels):
+        if len(starts) == 0:
+            return None
+        if len(starts) <= _LEAF_SIZE:
+            return _Leaf(starts, stops, labels)
+        # the median endpoint splits the intervals that do not contain it into two halves of similar size. It may
+        # fall in a gap between intervals, leaving the node empty, but it always lies between the smallest start and
+        # the largest stop, so neither half holds all the intervals and the recursion terminates
+        center = np.median(np.concatenate((starts, stops)))
+        before = stops <= center
+        after = starts > center
+        here = ~(before | after)
+        return _Node(center, starts[here], stops[here], labels[here],
+                     self.__build(starts[before], stops[before], labels[before]),
+                     self.__build(starts[after], stops[after], labels[after]))
+
+    def stab(self, t):
+        """
+        Return the labels of the intervals containing time 't'.
+        """
+        found = []
+        node = self.root
+        while node is not None:
+            if isinstance(node, _Leaf):
+                found.append(node.labels[(node.starts <= t) & (t < node.stops)])
+                break
+            if t < node.center:
+                # every interval at the node stops after its center, so those starting at or before t contain it
+                found.append(node.start_labels[:np.searchsorted(node.starts, t, side='right')])
+                node = node.left
+            else:
+                # every interval at the node starts at or before its center, so those stopping after t contain it
+                found.append(node.stop_labels[np.searchsorted(node.stops, t, side='right'):])
+                node = node.right
+        return self.__labels(found)
+
+    def overlap(self, t0, t1):
+        """
+        Return the labels of the intervals overlapping the time range [t0, t1).
+        """
+        if t0 >= t1:
+            return self.__labels([])
+
+        found = []
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            if node is None:
+                continue
+            if isinstance(node, _Leaf):
+                found.append(node.labels[(node.starts < t1) & (node.stops > t0)])
+            elif t1 <= node.center:
+                found.append(node.start_labels[:np.searchsorted(node.starts, t1, side='left')])
+                nodes.append(node.left)
+            elif t0 > node.center:
+                found.append(node.stop_labels[np.searchsorted(node.stops, t0, side='right'):])
+                nodes.append(node.right)
+            else:
+                # the range contains the center, so it overlaps every interval at the node
+                found.append(node.start_labels)
+                nodes.extend((node.left, node.right))
+        return self.__labels(found)
+
+    @staticmethod
+    def __labels(found):
+        if not found:
+            return np.array([], dtype=np.intp)
+        return np.unique(np.concatenate(found))
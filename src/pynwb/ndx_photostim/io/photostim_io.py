@@ -1,8 +1,13 @@
+from hdmf.backends.hdf5.h5_utils import H5DataIO
+from hdmf.build import ObjectMapper
+from hdmf.common.io.table import DynamicTableMap
+from hdmf.utils import docval, get_docval
 from pynwb import register_map
 from pynwb.io.base import TimeSeriesMap
 from pynwb.io.core import NWBContainerMapper
 
-from ..photostim import PhotostimulationSeries, HolographicPattern
+from ..photostim import PhotostimulationSeries, HolographicPattern, PhotostimulationTable
+from ..storage import dataset_io_settings, h5_data_io, wrap_dataset
 #
 #
 # @register_map(HolographicPattern)
@@ -25,3 +30,81 @@ from ..photostim import PhotostimulationSeries, HolographicPattern
 #         self.map_spec('sweep_pattern', stim_method_spec.get_attribute('sweep_pattern'))
 #         self.map_spec('time_per_sweep', stim_method_spec.get_attribute('time_per_sweep'))
 #         self.map_spec('num_sweeps', stim_method_spec.get_attribute('num_sweeps'))
+
+
+@register_map(HolographicPattern)
+class HolographicPatternMap(NWBContainerMapper):
+    '''Apply the storage profile of the pattern to its ROI datasets.'''
+
+    @NWBContainerMapper.object_attr("image_mask_roi")
+    def image_mask_roi_attr(self, container, manager):
+        mask = container.image_mask_roi
+        # chunk 3D masks plane by plane
+        plane_axis = 2 if mask is not None and len(mask.shape) == 3 else None
+        return wrap_dataset(mask, container.storage_profile, plane_axis)
+
+    @NWBContainerMapper.object_attr("pixel_roi")
+    def pixel_roi_attr(self, container, manager):
+        return wrap_dataset(container.pixel_roi, container.storage_profile)
+
+    @NWBContainerMapper.object_attr("sparse_mask_roi")
+    def sparse_mask_roi_attr(self, container, manager):
+        return wrap_dataset(container.sparse_mask_roi, container.storage_profile)
+
+
+@register_map(PhotostimulationSeries)
+class PhotostimulationSeriesMap(TimeSeriesMap):
+    '''Write the current contents of the growable data and timestamps buffers, applying the storage profile of the
+    series (except the timestamps of 'intervals' data, derived from its start times), and construct series read from
+    a file without validating their data.'''
+
+    @TimeSeriesMap.constructor_arg("validate")
+    def validate_carg(self, builder, manager):
+        # data read from a file was checked when it was written, so it is not loaded to be checked again
+        return False
+
+    @TimeSeriesMap.object_attr("data")
+    def data_attr(self, container, manager):
+        return wrap_dataset(container.data, container.storage_profile)
+
+    @TimeSeriesMap.object_attr("timestamps")
+    def timestamps_attr(self, container, manager):
+        return wrap_dataset(container.timestamps, container.storage_profile)
+
+    @docval(*get_docval(ObjectMapper.get_attr_value), returns='the value of the attribute')
+    def get_attr_value(self, **kwargs):
+        spec, container = kwargs['spec'], kwargs['container']
+        if container.format == 'intervals' and self.get_attribute(spec) == 'timestamps':
+            # the timestamps of 'intervals' data are the start times in its first column, so they are not stored
+            # twice; they are taken from 'data' again when the series is read
+            return None
+        return super().get_attr_value(**kwargs)
+
+
+@register_map(PhotostimulationTable)
+class PhotostimulationTableMap(DynamicTableMap):
+    '''Apply the storage profile of the table to its ids and columns.'''
+
+    @docval(*get_docval(ObjectMapper.build), returns="the Builder representing the given AbstractContainer")
+    def build(self, **kwargs):
+        table = kwargs['container']
+        if table.storage_profile is not None:
+            # object references to the series are written as is
+            for data in [table.id] + [col for col in table.columns if col.name != 'series']:
+                self.__set_storage(data, table.storage_profile)
+        return super().build(**kwargs)
+
+    @staticmethod
+    def __set_storage(data, profile):
+        """
+        Wrap the values of 'data' in H5DataIO, or update the chunk shape of values wrapped by a previous write to
+        match the current number of rows.
+        """
+        values = data.data.data if isinstance(data.data, H5DataIO) else data.data
+        settings = dataset_io_settings(values, profile)
+        if settings is None:
+            return
+        if isinstance(data.data, H5DataIO):
+            data.data.io_settings.update(settings)
+        else:
+            data.set_data_io(h5_data_io, settings)
@@ -0,0 +1,96 @@
+import numpy as np
+from hdmf.data_utils import AbstractDataChunkIterator
+
+# values allowed in 'data' for each format of PhotostimulationSeries
+FORMAT_VALUES = {'interval': (-1, 1), 'series': (0, 1)}
+
+
+class StreamLengthCheck:
+    """
+    Compare the number of values streamed for 'data' and 'timestamps' once both streams are exhausted. The length
+    of a stream that is not iterated (e.g., 'timestamps' given as an array) can be set up front.
+    """
+
+    def __init__(self, series_name):
+        self.series_name = series_name
+        self.lengths = dict()
+
+    def set_length(self, key, length):
+        self.lengths[key] = length
+        if len(self.lengths) == 2 and len(set(self.lengths.values())) > 1:
+            raise ValueError(f"PhotostimulationSeries '{self.series_name}': 'data' and 'timestamps' need to be the "
+                             f"same length (got {self.lengths['data']} and {self.lengths['timestamps']}).")
+
+
+class ValidatingDataChunkIterator(AbstractDataChunkIterator):
+    """
+    Wrap a data chunk iterator for a PhotostimulationSeries, checking the values of each chunk as it is written so
+    that streamed 'data' is validated without holding it in memory. If 'alternating', consecutive values (e.g., the
+    onsets and offsets of 'interval' data) must differ, starting with 'first_value' if given, and if 'non_decreasing', the values (e.g., 'timestamps', or
+    the flattened rows of 'intervals' data) must not decrease, also across chunks. The number of values is counted and
+    reported to an optional StreamLengthCheck when the wrapped iterator is exhausted.
+    """
+
+    def __init__(self, iterator, key, allowed_values=None, length_check=None, alternating=False,
+                 non_decreasing=False, first_value=None):
+        self.iterator = iterator
+        self.key = key
+        self.allowed_values = None if allowed_values is None else np.asarray(allowed_values)
+        self.length_check = length_check
+        self.alternating = alternating
+        self.non_decreasing = non_decreasing
+        self.first_value = first_value
+        self.num_values = 0
+        self.__last_value = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            chunk = next(self.iterator)
+        except StopIteration:
+            if self.length_check is not None:
+                self.length_check.set_length(self.key, self.num_values)
+            raise
+
+        values = np.asarray(chunk.data)
+        if self.allowed_values is not None and not np.isin(values, self.allowed_values).all():
+            raise ValueError(f"'{self.key}' values must be one of {self.allowed_values.tolist()}, found "
+                             f"{np.setdiff1d(values, self.allowed_values).tolist()}.")
+        if (self.alternating or self.non_decreasing) and values.size > 0:
+            self.__check_order(values)
+        self.num_values += len(values)
+        return chunk
+
+    def __check_order(self, values):
+        """
+        Check the order of the values of a chunk, following the last value of the previous chunk.
+        """
+        values = values.ravel()
+        if self.__last_value is None and self.first_value is not None and values[0] != self.first_value:
+            raise ValueError(f"'{self.key}' values must start with {self.first_value:g}, found {values[0]:g}.")
+        if self.__last_value is not None:
+            values = np.concatenate(([self.__last_value], values))
+        if self.alternating and (values[1:] == values[:-1]).any():
+            raise ValueError(f"'{self.key}' values must alternate between onsets (1) and offsets (-1), found "
+                             f"consecutive values of {values[np.argmax(values[1:] == values[:-1])]:g}.")
+        if self.non_decreasing and (values[1:] < values[:-1]).any():
+            index = int(np.argmax(values[1:] < values[:-1]))
+            raise ValueError(f"'{self.key}' values must be non-decreasing, found {values[index + 1]:g} after "
+                             f"{values[index]:g}.")
+        self.__last_value = values[-1]
+
+    def recommended_chunk_shape(self):
+        return self.iterator.recommended_chunk_shape()
+
+    def recommended_data_shape(self):
+        return self.iterator.recommended_data_shape()
+
+    @property
+    def dtype(self):
+        return self.iterator.dtype
+
+    @property
+    def maxshape(self):
+        return self.iterator.maxshape
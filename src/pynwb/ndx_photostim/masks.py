@@ -0,0 +1,221 @@
+import os
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# upper bound on the number of window elements evaluated at once when stamping ROIs
+_CHUNK_ELEMENTS = 2 ** 22
+
+
+def mask_shape(dimension):
+    """
+    Return the shape of the dense mask for a pattern with 'dimension' [width, height] or [width, height, depth]
+    (rows are indexed by y and columns by x, followed by the plane index z for 3D patterns).
+    """
+    return (int(dimension[1]), int(dimension[0])) + tuple(int(d) for d in dimension[2:])
+
+
+def _half_extents(roi_size):
+    """
+    Return the half width/height of a ROI, and whether it is circular.
+    """
+    if not isinstance(roi_size, Iterable):
+        return roi_size / 2, roi_size / 2, True
+    return roi_size[0] / 2, roi_size[1] / 2, False
+
+
+def _check_roi_size(roi_size, ndim):
+    """
+    Check that an iterable 'roi_size' has one entry per axis of the pattern.
+    """
+    if isinstance(roi_size, Iterable) and len(roi_size) != ndim:
+        raise ValueError(f"'roi_size' must be a scalar or have {ndim} elements for {ndim}D patterns.")
+
+
+def _window_offsets(half_extent):
+    """
+    Offsets (relative to the floor of the ROI center) covering every pixel within 'half_extent' of the center.
+    """
+    reach = int(np.ceil(half_extent))
+    return np.arange(-reach, reach + 2)
+
+
+def stamp_rois(mask, centers, roi_size, value=1):
+    """
+    Stamp ROIs centered at 'centers' ([x, y] coordinates; further columns are ignored) into the 2D array 'mask' in
+    place. Each ROI is evaluated only within its bounding-box window, and all centers are rasterized in batched
+    broadcast passes, so the cost scales with the total ROI area rather than with the number of ROIs times the frame
+    size.
+    """
+    centers = np.asarray(centers, dtype=float)
+    if len(centers) == 0:
+        return mask
+    # only the [x, y] coordinates are used, e.g., of [x, y, z] rows of a 3D pixel_roi stamped into a 2D mask
+    centers = np.atleast_2d(centers)[:, :2]
+
+    height, width = mask.shape
+    half_x, half_y, circular = _half_extents(roi_size)
+    dx = _window_offsets(half_x)
+    dy = _window_offsets(half_y)
+
+    chunk = max(1, _CHUNK_ELEMENTS // (len(dx) * len(dy)))
+    for i in range(0, len(centers), chunk):
+        cx = centers[i:i + chunk, 0]
+        cy = centers[i:i + chunk, 1]
+        xs = np.floor(cx).astype(np.intp)[:, None] + dx
+        ys = np.floor(cy).astype(np.intp)[:, None] + dy
+        x_dist = xs - cx[:, None]
+        y_dist = ys - cy[:, None]
+
+        if circular:
+            inside = np.sqrt(x_dist[:, None, :] ** 2 + y_dist[:, :, None] ** 2) <= roi_size / 2
+        else:
+            inside = (np.abs(x_dist) <= half_x)[:, None, :] & (np.abs(y_dist) <= half_y)[:, :, None]
+        inside &= ((xs >= 0) & (xs < width))[:, None, :]
+        inside &= ((ys >= 0) & (ys < height))[:, :, None]
+
+        roi_idx, y_idx, x_idx = np.nonzero(inside)
+        mask[ys[roi_idx, y_idx], xs[roi_idx, x_idx]] = value
+    return mask
+
+
+def _plane_rois(dimension, pixel_roi, roi_size):
+    """
+    Yield (z, centers, cross_section) for every plane of a 3D pattern, where 'centers' are the [x, y] coordinates of
+    the ROIs intersecting plane z and 'cross_section' is the 2D 'roi_size' of their section through it. A scalar
+    'roi_size' denotes a cylinder with diameter and height 'roi_size'; a 3-element 'roi_size' denotes a cuboid of
+    [width, height, depth].
+    """
+    _check_roi_size(roi_size, 3)
+    centers = np.asarray(pixel_roi, dtype=float).reshape(-1, 3)
+    if isinstance(roi_size, Iterable):
+        half_z = roi_size[2] / 2
+        cross_section = roi_size[:2]
+    else:
+        half_z = roi_size / 2
+        cross_section = roi_size
+
+    centers = centers[np.argsort(centers[:, 2], kind='stable')]
+    for z in range(int(dimension[2])):
+        lo = np.searchsorted(centers[:, 2], z - half_z, side='left')
+        hi = np.searchsorted(centers[:, 2], z + half_z, side='right')
+        yield z, centers[lo:hi, :2], cross_section
+
+
+def iter_mask_planes(dimension, pixel_roi, roi_size, dtype=float):
+    """
+    Yield (z, plane) for every plane of the mask of a 3D pattern, where 'plane' is a 2D array of shape
+    [height, width]. Only one plane is held in memory at a time.
+    """
+    shape = mask_shape(dimension)[:2]
+    for z, centers, cross_section in _plane_rois(dimension, pixel_roi, roi_size):
+        yield z, stamp_rois(np.zeros(shape, dtype=dtype), centers, cross_section)
+
+
+def rasterize_rois(dimension, pixel_roi, roi_size, dtype=float):
+    """
+    Convert 'pixel_roi' centers into a dense mask, where ROIs are encoded with a value of 1. 3D patterns are
+    rasterized plane by plane directly into the output volume, so memory use beyond the volume itself is bounded.
+    """
+    return _rasterize_into(np.zeros(shape=mask_shape(dimension), dtype=dtype), dimension, pixel_roi, roi_size)
+
+
+def _rasterize_into(mask, dimension, pixel_roi, roi_size):
+    """
+    As 'rasterize_rois', stamping the ROIs into the zeroed array 'mask' in place.
+    """
+    if len(dimension) == 3:
+        for z, centers, cross_section in _plane_rois(dimension, pixel_roi, roi_size):
+            stamp_rois(mask[:, :, z], centers, cross_section)
+        return mask
+
+    _check_roi_size(roi_size, 2)
+    return stamp_rois(mask, pixel_roi, roi_size)
+
+
+def _render_shared(shm_name, offset, shape, dtype, dimension, pixel_roi, roi_size):
+    """
+    Rasterize a pattern in a worker process, directly into its slot of the shared memory block 'shm_name'.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        mask = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        _rasterize_into(mask, dimension, pixel_roi, roi_size)
+        del mask
+    finally:
+        shm.close()
+
+
+def render_masks(patterns, workers=None, dtype=float):
+    """
+    Rasterize the masks of many 'pixel_roi' patterns (see HolographicPattern.pixel_to_image_mask_roi) across a pool
+    of 'workers' processes (by default, one per CPU). Workers write the masks into a block of shared memory instead
+    of returning pickled arrays, and only the ROI centers of each pattern are sent to them. Returns the list of
+    masks, in the order of 'patterns'.
+    """
+    specs = []
+    for pattern in patterns:
+        if pattern.pixel_roi is None:
+            raise ValueError(f"'render_masks' requires patterns defined with 'pixel_roi', but '{pattern.name}' has "
+                             "none.")
+        specs.append((tuple(pattern.dimension), np.asarray(pattern.pixel_roi, dtype=float), pattern.roi_size))
+
+    dtype = np.dtype(dtype)
+    workers = min(workers or os.cpu_count() or 1, len(specs))
+    if workers <= 1:
+        return [rasterize_rois(dimension, pixel_roi, roi_size, dtype=dtype)
+                for dimension, pixel_roi, roi_size in specs]
+
+    shapes = [mask_shape(dimension) for dimension, _, _ in specs]
+    offsets = np.concatenate(([0], np.cumsum([np.prod(shape) * dtype.itemsize for shape in shapes])))
+    # shared memory is zero-filled when created, so the workers only stamp the ROIs
+    shm = shared_memory.SharedMemory(create=True, size=max(1, int(offsets[-1])))
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_render_shared, shm.name, int(offset), shape, dtype.str, *spec)
+                       for offset, shape, spec in zip(offsets, shapes, specs)]
+            for future in futures:
+                future.result()
+        masks = [np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=int(offset)).copy()
+                 for offset, shape in zip(offsets, shapes)]
+    finally:
+        shm.close()
+        shm.unlink()
+    return masks
+
+
+def mask_to_pixels(mask):
+    """
+    Return an array with one row per pixel (or voxel) of 'mask' with positive weight, holding its index along each
+    axis of the mask followed by its weight.
+    """
+    mask = np.asarray(mask)
+    index = np.nonzero(mask > 0)
+    return np.column_stack(index + (mask[index],))
+
+
+def pixels_to_mask(pixels, shape):
+    """
+    Inverse of 'mask_to_pixels': return the dense mask of size 'shape' in which each listed pixel holds its weight.
+    """
+    pixels = np.asarray(pixels)
+    mask = np.zeros(shape=tuple(int(s) for s in shape), dtype=pixels.dtype)
+    index = tuple(pixels[:, :-1].astype(np.intp).T)
+    mask[index] = pixels[:, -1]
+    return mask
+
+
+def mask_roi_centers(mask):
+    """
+    Return the weighted center of each connected ROI (pixels with positive weight, connected along the axes) of
+    'mask', as an array with one row of coordinates per ROI.
+    """
+    from scipy import ndimage
+
+    mask = np.asarray(mask)
+    weights = np.where(mask > 0, mask, 0)
+    labels, num_rois = ndimage.label(weights > 0)
+    centers = ndimage.center_of_mass(weights, labels, np.arange(1, num_rois + 1))
+    return np.array(centers, dtype=float).reshape(num_rois, mask.ndim)
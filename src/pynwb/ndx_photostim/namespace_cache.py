@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import pynwb
+from hdmf.spec.namespace import YAMLSpecReader
+
+# set to a non-empty value to always parse the YAML spec files
+DISABLE_ENV_VAR = 'NDX_PHOTOSTIM_NO_SPEC_CACHE'
+# directory holding the parsed spec files; defaults to '<user cache dir>/ndx-photostim'
+CACHE_DIR_ENV_VAR = 'NDX_PHOTOSTIM_CACHE_DIR'
+
+
+def default_cache_dir():
+    """
+    Return the directory where parsed spec files are cached.
+    """
+    if os.environ.get(CACHE_DIR_ENV_VAR):
+        return os.environ[CACHE_DIR_ENV_VAR]
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'ndx-photostim')
+
+
+class CachedYAMLSpecReader(YAMLSpecReader):
+    """
+    YAMLSpecReader that caches each parsed namespace and spec file as JSON, keyed by the SHA-256 hash of the YAML
+    file. Later reads of an unchanged file load the JSON instead of parsing the YAML; a changed file has a new hash,
+    so it is parsed again and cached under the new key. Any failure to read or write the cache falls back to
+    parsing the YAML.
+    """
+
+    def __init__(self, indir, cache_dir):
+        super().__init__(indir=indir)
+        self.cache_dir = cache_dir
+
+    def read_namespace(self, namespace_path):
+        return self.__read_cached(namespace_path, super().read_namespace)
+
+    def read_spec(self, spec_path):
+        return self.__read_cached(spec_path, super().read_spec)
+
+    def __read_cached(self, path, parse):
+        full_path = path if os.path.isabs(path) else os.path.join(self.source, path)
+        with open(full_path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        cache_path = os.path.join(self.cache_dir, f"{os.path.basename(full_path)}.{digest}.json")
+
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        parsed = parse(path)
+        try:
+            self.__write_cache(cache_path, parsed)
+        except (OSError, TypeError, ValueError):
+            pass
+        return parsed
+
+    def __write_cache(self, cache_path, parsed):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # write to a temporary file first so that concurrent readers never see a partial cache file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(parsed, f)
+            os.replace(tmp_path, cache_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def load_namespaces(namespace_path):
+    """
+    Load the namespace file at 'namespace_path' into the pynwb type map, reading the parsed spec files from the
+    cache when possible.
+    """
+    # pynwb.load_namespaces does not accept a spec reader, and pynwb.get_type_map() returns a copy of the global type
+    # map, into which loaded classes would not be registered. The global map itself is only reachable as the private
+    # module attribute; if pynwb renames it, the namespace is loaded without the cache.
+    type_map = vars(pynwb).get('__TYPE_MAP')
+    if type_map is None or os.environ.get(DISABLE_ENV_VAR):
+        return pynwb.load_namespaces(namespace_path)
+
+    reader = CachedYAMLSpecReader(indir=os.path.dirname(namespace_path), cache_dir=default_cache_dir())
+    return type_map.load_namespaces(namespace_path, reader=reader)
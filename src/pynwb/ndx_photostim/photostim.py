@@ -1,8 +1,8 @@
 from collections.abc import Iterable
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
+from hdmf.data_utils import AbstractDataChunkIterator
 from hdmf.utils import docval, getargs, popargs, popargs_to_dict, get_docval
 from pynwb import register_class
 from pynwb.base import TimeSeries
@@ -10,8 +10,20 @@ from pynwb.core import DynamicTable
 from pynwb.device import Device
 from pynwb.file import NWBContainer
 
+from .buffer import GrowableArray
+from .hashing import content_digest
+from .intervals import IntervalTree
+from .iterators import FORMAT_VALUES, StreamLengthCheck, ValidatingDataChunkIterator
+from .masks import iter_mask_planes, mask_roi_centers, mask_to_pixels, pixels_to_mask, rasterize_rois
+from .search import RateTimestamps, search_sorted
+from .storage import storage_profile_docval
+from .validation import check_format_args, validate_appended_events, validate_events, validate_timestamps
+
 namespace = 'ndx-photostim'
 
+# dtype of the in-memory 'data' buffer of a PhotostimulationSeries for each format
+DATA_DTYPES = {'interval': np.int8, 'intervals': np.float64, 'series': np.int8, 'events': np.int64}
+
 @register_class('SpatialLightModulator', namespace)
 class SpatialLightModulator(Device):
     """
@@ -36,6 +48,20 @@ class SpatialLightModulator(Device):
         for key, val in args_to_set.items():
             setattr(self, key, val)
 
+    def content_hash(self):
+        """
+        Return a hash of the field values of the SpatialLightModulator (excluding its name).
+        """
+        return self._content_digest(description=self.description, manufacturer=self.manufacturer, model=self.model,
+                                    size=self.size)
+
+    @staticmethod
+    def _content_digest(description=None, manufacturer=None, model=None, size=None, **kwargs):
+        """
+        Hash of a SpatialLightModulator with the given field values, computed without constructing it.
+        """
+        return content_digest('SpatialLightModulator', description, manufacturer, model, size)
+
 
 @register_class('Laser', namespace)
 class Laser(Device):
@@ -64,6 +90,23 @@ class Laser(Device):
         for key, val in args_to_set.items():
             setattr(self, key, val)
 
+    def content_hash(self):
+        """
+        Return a hash of the field values of the Laser (excluding its name).
+        """
+        return self._content_digest(description=self.description, manufacturer=self.manufacturer, model=self.model,
+                                    wavelength=self.wavelength, power=self.power,
+                                    peak_pulse_energy=self.peak_pulse_energy, pulse_rate=self.pulse_rate)
+
+    @staticmethod
+    def _content_digest(description=None, manufacturer=None, model=None, wavelength=None, power=None,
+                        peak_pulse_energy=None, pulse_rate=None, **kwargs):
+        """
+        Hash of a Laser with the given field values, computed without constructing it.
+        """
+        return content_digest('Laser', description, manufacturer, model, wavelength, power, peak_pulse_energy,
+                              pulse_rate)
+
 
 @register_class('PhotostimulationMethod', namespace)
 class PhotostimulationMethod(NWBContainer):
@@ -136,6 +179,26 @@ class PhotostimulationMethod(NWBContainer):
         else:
             self.laser = laser
 
+    def content_hash(self):
+        """
+        Return a hash of the field values of the PhotostimulationMethod (excluding its name), including those of its
+        SLM and laser.
+        """
+        return self._content_digest(stimulus_method=self.stimulus_method, sweep_pattern=self.sweep_pattern,
+                                    sweep_size=self.sweep_size, time_per_sweep=self.time_per_sweep,
+                                    num_sweeps=self.num_sweeps, power_per_target=self.power_per_target,
+                                    opsin=self.opsin, slm=self.slm, laser=self.laser)
+
+    @staticmethod
+    def _content_digest(stimulus_method=None, sweep_pattern=None, sweep_size=None, time_per_sweep=None,
+                        num_sweeps=None, power_per_target=None, opsin=None, slm=None, laser=None, **kwargs):
+        """
+        Hash of a PhotostimulationMethod with the given field values, computed without constructing it.
+        """
+        return content_digest('PhotostimulationMethod', stimulus_method, sweep_pattern, sweep_size, time_per_sweep,
+                              num_sweeps, power_per_target, opsin, None if slm is None else slm.content_hash(),
+                              None if laser is None else laser.content_hash())
+
 
 @register_class('HolographicPattern', namespace)
 class HolographicPattern(NWBContainer):
@@ -143,7 +206,7 @@ class HolographicPattern(NWBContainer):
     Container to store the pattern used in a photostimulation experiment.
     """
 
-    __nwbfields__ = ('image_mask_roi', 'pixel_roi', 'stim_duration', 'roi_size', 'dimension',
+    __nwbfields__ = ('image_mask_roi', 'pixel_roi', 'sparse_mask_roi', 'stim_duration', 'roi_size', 'dimension',
                      {'name': 'method', 'child': True})
 
     @docval(*get_docval(NWBContainer.__init__) + (
@@ -157,6 +220,13 @@ class HolographicPattern(NWBContainer):
                      "[x2, y2, z2], …) of each ROI, where the items in the list are the coordinates of the center of "
                      "the ROI. The size of each ROI is specified via the required 'roi_size' parameter."),
              'default': None, 'shape': ((None, 2), (None, 3))},
+            {'name': 'sparse_mask_roi', 'type': 'array_data',
+             'doc': ("ROIs designated as a sparse list of the pixels ([x, y, weight]) or voxels ([x, y, z, weight]) "
+                     "of the mask with a non-zero value, where x, y (and z) index the axes of a mask of size "
+                     "'dimension'. Pixels that are not listed have a value of 0."),
+             'default': None, 'shape': ((None, 3), (None, 4))},
+            {'name': 'sparse', 'type': bool,
+             'doc': ("If True, store 'image_mask_roi' as 'sparse_mask_roi'."), 'default': False},
             {'name': 'stim_duration', 'type': (int, float),
              'doc': ("Duration (in sec) the stimulus is presented following onset."), 'default': None},
 
@@ -172,12 +242,19 @@ class HolographicPattern(NWBContainer):
                      "'image_mask_roi.' Required when using 'pixel_roi.'"),
              'default': None, 'shape': ((2,), (3,))},
             {'name': 'method', 'type': (PhotostimulationMethod),
-             'doc': ("PhotostimulationMethod associated with current photostim series.")}
+             'doc': ("PhotostimulationMethod associated with current photostim series.")},
+            {'name': 'mask_cache_max_bytes', 'type': int,
+             'doc': ("Largest mask (in bytes) kept in the 'image_mask' cache. Larger masks are recomputed on every "
+                     "access. If None, masks of any size are cached."), 'default': None},
+            storage_profile_docval('the ROI datasets')
             )
             )
     def __init__(self, **kwargs):
-        keys_to_set = ('image_mask_roi', 'pixel_roi', 'stim_duration', 'roi_size', 'dimension', 'method')
+        keys_to_set = ('image_mask_roi', 'pixel_roi', 'sparse_mask_roi', 'stim_duration', 'roi_size', 'dimension',
+                       'method')
         args_to_set = popargs_to_dict(keys_to_set, kwargs)
+        sparse, mask_cache_max_bytes, storage_profile = popargs('sparse', 'mask_cache_max_bytes', 'storage_profile',
+                                                                kwargs)
 
         roi_size = args_to_set['roi_size']
         if isinstance(roi_size, Iterable):
@@ -186,8 +263,10 @@ class HolographicPattern(NWBContainer):
 
         super().__init__(**kwargs)
 
-        if args_to_set['pixel_roi'] is None and args_to_set['image_mask_roi'] is None:
-            raise TypeError("Must provide 'pixel_roi' or 'image_mask_roi' when constructing HolographicPattern.")
+        if (args_to_set['pixel_roi'] is None and args_to_set['image_mask_roi'] is None
+                and args_to_set['sparse_mask_roi'] is None):
+            raise TypeError("Must provide 'pixel_roi', 'image_mask_roi' or 'sparse_mask_roi' when constructing "
+                            "HolographicPattern.")
 
         if args_to_set['dimension'] is not None and isinstance(args_to_set['dimension'], list):
             args_to_set['dimension'] = tuple(args_to_set['dimension'])
@@ -205,6 +284,13 @@ class HolographicPattern(NWBContainer):
             if args_to_set['dimension'] is None:
                 args_to_set['dimension'] = mask_dim
 
+            if sparse:
+                args_to_set['sparse_mask_roi'] = mask_to_pixels(args_to_set['image_mask_roi'])
+                args_to_set['image_mask_roi'] = None
+
+        if args_to_set['sparse_mask_roi'] is not None and args_to_set['dimension'] is None:
+            raise TypeError("'dimension' must be specified when using a sparse mask.")
+
 #             if len(np.setdiff1d(np.unique(args_to_set['image_mask_roi']), np.array([0, 1]))) > 0:
 #                 if len(np.setdiff1d(np.unique(args_to_set['image_mask_roi']), np.array([0., 1.]))) > 0:
 #                     raise ValueError("'image_mask_roi' data must be either 0 (off) or 1 (on).")
@@ -212,85 +298,112 @@ class HolographicPattern(NWBContainer):
         for key, val in args_to_set.items():
             setattr(self, key, val)
 
-    def show_mask(self):
+        self.mask_cache_max_bytes = mask_cache_max_bytes
+        self.storage_profile = storage_profile
+        self.__mask_cache = None
+
+    # fields 'image_mask' is derived from; setting any of them drops the cached mask
+    _MASK_FIELDS = ('image_mask_roi', 'pixel_roi', 'sparse_mask_roi', 'roi_size', 'dimension')
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in HolographicPattern._MASK_FIELDS:
+            self.__mask_cache = None
+
+    @property
+    def image_mask(self):
         """
-        Display a plot with a 2D mask of the holographic pattern
-        (white regions denote ROIs, black regions the background).
+        Dense, read-only mask of the holographic pattern: a view of 'image_mask_roi', or the mask derived from
+        'sparse_mask_roi' or 'pixel_roi'. The mask is computed once and cached, so repeated accesses are O(1). The
+        cache is dropped when 'image_mask_roi', 'sparse_mask_roi', 'pixel_roi', 'roi_size' or 'dimension' are set;
+        after modifying one of them in place, call 'clear_mask_cache'.
         """
-        if len(self.dimension) == 3:
-            raise ValueError('Cannot display 3D masks')
-
-        if self.pixel_roi is not None:
-            center_points = [[roi[0], roi[1]] for roi in self.pixel_roi]
-            center_points = np.array(center_points)
-            image_mask_roi = self.pixel_to_image_mask_roi()
-            plt.imshow(image_mask_roi, 'gray', interpolation='none')
-            plt.scatter(center_points[:, 0], center_points[:, 1], color='red', s=10)
+        if self.__mask_cache is not None:
+            return self.__mask_cache
 
         if self.image_mask_roi is not None:
-            image_mask_roi = self.image_mask_roi
-            plt.imshow(image_mask_roi, 'gray', interpolation='none')
+            # a view, so that the stored array stays writable
+            mask = np.asarray(self.image_mask_roi).view()
+        elif self.sparse_mask_roi is not None:
+            mask = pixels_to_mask(self.sparse_mask_roi, self.dimension)
+        else:
+            mask = self.pixel_to_image_mask_roi()
+        mask.flags.writeable = False
 
-        plt.axis('off')
-        plt.show()
+        if self.mask_cache_max_bytes is None or mask.nbytes <= self.mask_cache_max_bytes:
+            self.__mask_cache = mask
+        return mask
 
-    @staticmethod
-    def _create_circular_mask(dimensions, center, diameter):
+    def clear_mask_cache(self):
         """
-        Create a circular mask at coordinate.
+        Drop the cached 'image_mask', e.g., after modifying 'pixel_roi' or 'sparse_mask_roi' in place.
         """
-        Y, X = np.ogrid[:dimensions[1], :dimensions[0]]
-        dist_from_center = np.sqrt((X - center[0]) ** 2 + (Y - center[1]) ** 2)
+        self.__mask_cache = None
 
-        mask = dist_from_center <= diameter / 2
-        return mask
-
-    ## TO-DO: fxn looks incomplete, is there a mask created if img_depth is not None? -PKL
-    @staticmethod
-    def _create_rectangular_mask(dimensions, center, roi_size, img_depth=None):
+    def content_hash(self):
         """
-        Create a sqaure mask at coordinate.
+        Return a hash of the content of the pattern (excluding its name): its ROI datasets, 'roi_size', 'dimension',
+        'stim_duration' and PhotostimulationMethod. Patterns with the same hash store the same stimulation pattern, and
+        can be written once and shared by several series (see PatternRegistry).
         """
-        if img_depth is None:
-            Y, X = np.ogrid[:dimensions[1], :dimensions[0]]
-            X_dist_from_center = (X - center[0])
-            Y_dist_from_center = (Y - center[1])
-            mask = (np.abs(X_dist_from_center) <= roi_size[0] / 2) & (np.abs(Y_dist_from_center) <= roi_size[1] / 2)
-        return mask
+        return content_digest('HolographicPattern', self.image_mask_roi, self.pixel_roi, self.sparse_mask_roi,
+                              self.roi_size, self.dimension, self.stim_duration,
+                              None if self.method is None else self.method.content_hash())
 
-    def pixel_to_image_mask_roi(self):
+    def show_mask(self):
         """
-        Convert a pixel_roi to an image_mask_roi. Returns a 2D array containing the mask, where ROIs are encoded with a value of 1.
+        Display a plot with a 2D mask of the holographic pattern
+        (white regions denote ROIs, black regions the background).
         """
+        import matplotlib.pyplot as plt
+
         if len(self.dimension) == 3:
-            raise ValueError("Cannot convert 3D 'pixel_roi' to 'image_mask_roi'.")
+            raise ValueError('Cannot display 3D masks')
 
-        mask = np.zeros(shape=self.dimension)
-        for roi in self.pixel_roi:
+        plt.imshow(self.image_mask, 'gray', interpolation='none')
 
-            if not isinstance(self.roi_size, Iterable):
-                tmp_mask = self._create_circular_mask(self.dimension, roi, self.roi_size)
-            else:
-                tmp_mask = self._create_rectangular_mask(self.dimension, roi, self.roi_size)
-            mask[tmp_mask] = 1
+        if self.pixel_roi is not None and self.image_mask_roi is None and self.sparse_mask_roi is None:
+            center_points = np.asarray(self.pixel_roi)
+            plt.scatter(center_points[:, 0], center_points[:, 1], color='red', s=10)
 
-        return mask
+        plt.axis('off')
+        plt.show()
+
+    @docval({'name': 'dtype', 'type': (type, str, np.dtype), 'doc': ("Data type of the returned mask."),
+             'default': float})
+    def pixel_to_image_mask_roi(self, **kwargs):
+        """
+        Convert a pixel_roi to an image_mask_roi. Returns a 2D array of shape [height, width] (or a 3D array of shape
+        [height, width, depth] for 3D patterns) containing the mask, where ROIs are encoded with a value of 1. For 3D
+        patterns, a scalar 'roi_size' denotes a cylinder with diameter and height 'roi_size', and a 3-element
+        'roi_size' a cuboid.
+        """
+        dtype = getargs('dtype', kwargs)
+        return rasterize_rois(self.dimension, self.pixel_roi, self.roi_size, dtype=dtype)
+
+    @docval({'name': 'dtype', 'type': (type, str, np.dtype), 'doc': ("Data type of the returned planes."),
+             'default': float})
+    def iter_mask_planes(self, **kwargs):
+        """
+        Iterate over the planes of the mask of a 3D pixel_roi pattern, yielding (z, plane) tuples, where 'plane' is
+        a 2D array of shape [height, width]. Only one plane is held in memory at a time.
+        """
+        dtype = getargs('dtype', kwargs)
+        if len(self.dimension) != 3:
+            raise ValueError("'iter_mask_planes' requires a 3D pattern.")
+        return iter_mask_planes(self.dimension, self.pixel_roi, self.roi_size, dtype=dtype)
 
     @staticmethod
-    def image_to_pixel(image_mask):
+    def image_to_pixel(image_mask, centers=False):
         """
-        Converts an image_mask_roi into a pixel_mask_roi.
+        Converts an image_mask_roi into a pixel_mask_roi. Returns an (N, 3) array (or (N, 4) for 3D masks) with one
+        row per pixel with positive weight, holding the index of the pixel along each axis of the mask followed by
+        its weight. If 'centers' is True, returns instead the weighted center of each connected ROI in the mask, as
+        an (N, 2) or (N, 3) array of coordinates along each axis of the mask.
         """
-        pixel_mask = []
-        it = np.nditer(image_mask, flags=['multi_index'])
-        while not it.finished:
-            weight = it[0][()]
-            if weight > 0:
-                x = it.multi_index[0]
-                y = it.multi_index[1]
-                pixel_mask.append([x, y, 1])
-            it.iternext()
-        return pixel_mask
+        if centers:
+            return mask_roi_centers(image_mask)
+        return mask_to_pixels(image_mask)
 
 
 @register_class('PhotostimulationSeries', namespace)
@@ -299,15 +412,16 @@ class PhotostimulationSeries(TimeSeries):
     TimeSeries object for photostimulus presentation.
     """
 
-    __nwbfields__ = ('format', 'stim_duration', 'epoch_length',
+    __nwbfields__ = ('format', 'stim_duration', 'epoch_length', 'dense_length',
                      {'name': 'pattern', 'child': True},
                      {'name': 'unit', 'settable': False})
 
     @docval(*get_docval(TimeSeries.__init__, 'name'),
             {'name': 'format', 'type': str,
-             'doc': ("Format of data denoting stimulus presentation. Can be either 'interval' or 'series' (see "
-                     "description for the 'data' parameter for details)."), 'enum': ["interval", "series"]},
-            {'name': 'data', 'type': ('array_data', 'data', TimeSeries), 'shape': (None,),
+             'doc': ("Format of data denoting stimulus presentation. Can be 'interval', 'intervals', 'series' or "
+                     "'events' (see description for the 'data' parameter for details)."),
+             'enum': ["interval", "intervals", "series", "events"]},
+            {'name': 'data', 'type': ('array_data', 'data', TimeSeries), 'shape': ((None,), (None, 2)),
              'doc': ("1D list containing information about stimulus presentation. If format is 'interval', the onset "
                      "and offset of the stimulus is stored using a 1D array consisting of the values 1 (stimulus on) "
                      "and -1 (stimulus off). The corresponding times for the start and stop of the stimulus are "
@@ -318,7 +432,11 @@ class PhotostimulationSeries(TimeSeries):
                      "'timestamps[i]', for example, indicates the stimulus was presented at time 'timestamps[i]' for "
                      "'timestamps[i]'+'stim_duration' seconds. Alternatively, 'rate' can be specified instead of "
                      "'timestamps', when data are sampled uniformly. Either 'timestamps' or 'rate' must be specified "
-                     "when using the series format."), 'default': list()},
+                     "when using the series format. If format is 'intervals', data is a 2D array with one row of "
+                     "[start, stop] times (in seconds) per presentation, and 'timestamps' (the start times) can be "
+                     "omitted. If format is 'events', data holds the increasing indices of the samples with a value "
+                     "of 1 of 'series' data sampled at 'rate', and 'dense_length' the total number of samples."),
+             'default': list()},
             {'name': 'timestamps', 'type': ('array_data', 'data', TimeSeries, Iterable),
              'doc': ("Timestamps corresponding to stimulus presentation values contained in 'data'."),
              'default': None, 'shape': (None,)},
@@ -329,163 +447,447 @@ class PhotostimulationSeries(TimeSeries):
                      "'series'."), 'default': None},
             {'name': 'epoch_length', 'type': (int, float),
              'doc': ("Length of each epoch (in sec)."), 'default': None},
+            {'name': 'dense_length', 'type': int,
+             'doc': ("Number of samples of the 'series' data encoded by 'events' data. Must be specified if format is "
+                     "'events'."), 'default': None},
+            {'name': 'sparse', 'type': bool,
+             'doc': ("If True, store 'series' data sampled at 'rate' as 'events', i.e., as the indices of the "
+                     "samples with a value of 1."), 'default': False},
             {'name': 'pattern', 'type': (HolographicPattern),
              'doc': ("HolographicPattern associated with current photostim series.")},
             {'name': 'unit', 'type': str,
              'doc': ("Timestamps unit (default: seconds)."), 'default': 'seconds'},
             *get_docval(TimeSeries.__init__, 'resolution', 'conversion', 'starting_time',
-                        'comments', 'description', 'control', 'control_description', 'offset')
+                        'comments', 'description', 'control', 'control_description', 'offset'),
+            storage_profile_docval("the 'data' and 'timestamps'"),
+            {'name': 'validate', 'type': bool,
+             'doc': ("Whether to check the values of 'data' (and, for 'interval' data, that onsets and offsets "
+                     "alternate) and that 'timestamps' are non-decreasing. Set to False for data that is already "
+                     "known to be valid, e.g., from a checked acquisition pipeline. Missing arguments and "
+                     "mismatched lengths are always checked."), 'default': True}
             )
     def __init__(self, **kwargs):
-        # convert 'data' to np array
-        if isinstance(kwargs['data'], np.ndarray):
-            kwargs['data'] = list(kwargs['data'])
-        # convert 'timestamps' to list
-        if isinstance(kwargs['timestamps'], (list, tuple)):
-            kwargs['timestamps'] = list(kwargs['timestamps'])
-
-        # if using interval format...
-        if kwargs['format'] == 'interval':
-            if len(kwargs['data']) == 0:
-                # kwargs['data'] = np.array([])
-
-                if kwargs['timestamps'] is not None:
-                    raise ValueError("'timestamps' can't be specified without corresponding 'data'.")
-                kwargs['timestamps'] = []
-                # kwargs['timestamps'] = np.array([])
-            # if intervals are input, check that formatted correctly
-            else:
-                # check that timestamps are also input
-                if kwargs['timestamps'] is None:
-                    raise ValueError("Need to specify corresponding 'timestamps' for each entry in 'data'.")
-
-                # check data and timestamps are same length
-                if len(kwargs['data']) != len(kwargs['timestamps']):
-                    raise ValueError("'data' and 'timestamps' need to be the same length.")
-
-                if len(np.setdiff1d(np.unique(kwargs['data']), np.array([-1, 1]))) > 0:
-                    if len(np.setdiff1d(np.unique(kwargs['data']), np.array([-1., 1.]))) > 0:
-                        raise ValueError("'interval' data must be either -1 (offset) or 1 (onset).")
-
-        # if using series format...
-        if kwargs['format'] == 'series':
-            if kwargs['stim_duration'] is None:
-                raise ValueError("If 'format' is 'series', 'stim_duration' must be specified.")
-
-            if len(kwargs['data']) == 0:
-                # kwargs['data'] = np.array([])
-
-                if kwargs['timestamps'] is not None:
-                    raise ValueError("'timestamps' can't be specified without corresponding 'data'.")
-
-                if kwargs['rate'] is None:
-                    kwargs['timestamps'] = []
-                # kwargs['timestamps'] = np.array([])
-            else:
-                if kwargs['timestamps'] is None and kwargs['rate'] is None:
-                    raise ValueError("Either 'timestamps' or 'rate' must be specified.")
-
-            if kwargs['timestamps'] is not None:
-                # check data and timestamps are same length
-                if len(kwargs['data']) != len(kwargs['timestamps']):
-                    raise ValueError("'data' and 'timestamps' need to be the same length.")
+        validate, sparse = popargs('validate', 'sparse', kwargs)
+        # 'data' or 'timestamps' streamed from a data chunk iterator are validated chunk by chunk as they are written
+        streamed = any(isinstance(kwargs[key], AbstractDataChunkIterator) for key in ('data', 'timestamps'))
+        if streamed:
+            if sparse:
+                raise ValueError("'events' data cannot be streamed from an iterator.")
+            self._wrap_streams(kwargs, validate)
+        else:
+            check_format_args(kwargs, validate)
+            if sparse:
+                self._to_events(kwargs)
 
-                if len(np.setdiff1d(np.unique(kwargs['data']), np.array([0, 1]))) > 0:
-                    if len(np.setdiff1d(np.unique(kwargs['data']), np.array([0., 1.]))) > 0:
-                        raise ValueError("'series' data must be either 0 or 1.")
+        if kwargs['dense_length'] is not None and kwargs['format'] != 'events':
+            raise ValueError("'dense_length' can only be specified if 'format' is 'events'.")
 
-        keys_to_set = ('format', 'stim_duration', 'epoch_length', 'pattern')
+        keys_to_set = ('format', 'stim_duration', 'epoch_length', 'dense_length', 'pattern')
         args_to_set = popargs_to_dict(keys_to_set, kwargs)
+        storage_profile = popargs('storage_profile', kwargs)
 
+        # store in-memory 'data' and 'timestamps' in growable typed buffers
         data, timestamps = popargs('data', 'timestamps', kwargs)
+        if isinstance(data, (list, tuple, np.ndarray)):
+            data = self._data_buffer(args_to_set['format'], data, validate)
+        if isinstance(timestamps, (list, tuple, np.ndarray)):
+            timestamps = GrowableArray(timestamps, dtype=np.float64)
         self.__interval_data = data
         self.__interval_timestamps = timestamps
         kwargs['unit'] = 'seconds'
 
-        super().__init__(data=data, timestamps=timestamps, **kwargs)
+        super().__init__(data=self.data, timestamps=self.timestamps, **kwargs)
         for key, val in args_to_set.items():
             setattr(self, key, val)
+        self.storage_profile = storage_profile
+
+    @staticmethod
+    def _data_buffer(fmt, data, validate):
+        """
+        Return a growable buffer holding the in-memory 'data' of a series with format 'fmt'. Data that was not
+        validated keeps its dtype if it is wider than that of the format (e.g., float), so that no value is truncated.
+        """
+        dtype = DATA_DTYPES[fmt]
+        if not validate and len(data) > 0:
+            dtype = np.result_type(np.asarray(data).dtype, dtype)
+        return GrowableArray(data, dtype=dtype, row_shape=(2,) if fmt == 'intervals' else ())
+
+    @staticmethod
+    def _to_events(kwargs):
+        """
+        Replace the 'series' data sampled at 'rate' in 'kwargs' by the indices of its samples with a value of 1.
+        """
+        if kwargs['format'] != 'series' or kwargs['rate'] is None:
+            raise ValueError("Only 'series' data sampled at 'rate' can be stored as 'events'.")
+        data = np.asarray(kwargs['data'])
+        kwargs['format'] = 'events'
+        kwargs['dense_length'] = len(data)
+        kwargs['data'] = np.flatnonzero(data == 1)
+
+    @staticmethod
+    def _wrap_streams(kwargs, validate=True):
+        """
+        Check the arguments of a series with streamed 'data' or 'timestamps', and wrap each stream so that its values
+        are validated (unless 'validate' is False), and the lengths of 'data' and 'timestamps' compared, while it is
+        written.
+        """
+        fmt, data, timestamps = kwargs['format'], kwargs['data'], kwargs['timestamps']
+        if fmt == 'events':
+            raise ValueError("'events' data cannot be streamed from an iterator.")
+        if fmt in ('interval', 'intervals') and timestamps is None:
+            raise ValueError("Need to specify corresponding 'timestamps' for each entry in 'data'.")
+        if fmt == 'series':
+            if kwargs['stim_duration'] is None:
+                raise ValueError("If 'format' is 'series', 'stim_duration' must be specified.")
+            if timestamps is None and kwargs['rate'] is None:
+                raise ValueError("Either 'timestamps' or 'rate' must be specified.")
+
+        length_check = StreamLengthCheck(kwargs['name'])
+        if isinstance(data, AbstractDataChunkIterator):
+            allowed_values = FORMAT_VALUES.get(fmt) if validate else None
+            # 'interval' data alternates between onsets and offsets, starting with an onset
+            kwargs['data'] = ValidatingDataChunkIterator(data, 'data', allowed_values, length_check,
+                                                         alternating=validate and fmt == 'interval',
+                                                         non_decreasing=validate and fmt == 'intervals',
+                                                         first_value=1 if fmt == 'interval' else None)
+        else:
+            if validate:
+                validate_events(fmt, data)
+            length_check.set_length('data', len(data))
+
+        if isinstance(timestamps, AbstractDataChunkIterator):
+            kwargs['timestamps'] = ValidatingDataChunkIterator(timestamps, 'timestamps', length_check=length_check,
+                                                               non_decreasing=validate)
+        elif timestamps is not None:
+            if validate:
+                validate_timestamps(timestamps)
+            length_check.set_length('timestamps', len(timestamps))
 
     @docval({'name': 'start', 'type': (int, float), 'doc': ("Start of the interval (in seconds).")},
             {'name': 'stop', 'type': (int, float), 'doc': ("End of the interval (in seconds).")})
     def add_interval(self, **kwargs):
         """
         Function to indicate stimulus was presented from time 'start' to time 'end.' Required format is
-        'interval'.
+        'interval' or 'intervals'.
         """
         start, stop = getargs('start', 'stop', kwargs)
-        if self.format == 'series':
-            raise ValueError("Cannot add interval to PhotostimulationSeries with 'format' of 'series'.")
+        if self.format in ('series', 'events'):
+            raise ValueError(f"Cannot add interval to PhotostimulationSeries with 'format' of '{self.format}'.")
+
+        self._add_intervals([start], [stop])
+
+    @docval({'name': 'starts', 'type': 'array_data', 'doc': ("Starts of the intervals (in seconds)."),
+             'shape': (None,)},
+            {'name': 'stops', 'type': 'array_data', 'doc': ("Ends of the intervals (in seconds)."),
+             'shape': (None,)})
+    def add_intervals(self, **kwargs):
+        """
+        Function to indicate stimulus was presented from each time in 'starts' to the corresponding time in 'stops'.
+        All intervals are added in a single operation. Required format is 'interval' or 'intervals'.
+        """
+        starts, stops = getargs('starts', 'stops', kwargs)
+        if self.format in ('series', 'events'):
+            raise ValueError(f"Cannot add interval to PhotostimulationSeries with 'format' of '{self.format}'.")
 
-        self.__interval_data.append(1)
-        self.__interval_data.append(-1)
-        self.__interval_timestamps.append(start)
-        self.__interval_timestamps.append(stop)
+        self._add_intervals(starts, stops)
 
     @docval({'name': 'timestamp', 'type': (int, float, Iterable), 'doc': ("")})
     def add_onset(self, **kwargs):
         """
         Denote stimulation at time 'time', where time is a number or list of numbers. If type is 'series', add 1 to
-        'data' and 'time' to 'timestamps'. If format is 'interval', call 'add_interval' for the interval from 'time'
-        to 'time+stim_duration'.
+        'data' and 'time' to 'timestamps'. If format is 'interval', add the interval from 'time' to
+        'time+stim_duration'.
         """
-        if self.stim_duration is None:
-            raise ValueError("Cannot add presentation to PhotostimulationSeries without 'stim_duration'.")
-
         timestamps = getargs('timestamp', kwargs)
 
         if not isinstance(timestamps, Iterable):
             timestamps = [timestamps]
 
-        for ts in timestamps:
-            if self.format == 'interval':
-                self.add_interval(ts, ts + self.stim_duration)
-            else:
-                self.__interval_data.append(1)
-                self.__interval_timestamps.append(ts)
+        self._add_onsets(timestamps)
+
+    @docval({'name': 'timestamps', 'type': 'array_data', 'doc': ("Onset times (in seconds)."), 'shape': (None,)})
+    def add_onsets(self, **kwargs):
+        """
+        Denote stimulation at each time in 'timestamps', adding all presentations in a single operation. If format
+        is 'series', add 1 to 'data' and the times to 'timestamps'. If format is 'interval', add the intervals from
+        each time to 'time+stim_duration'.
+        """
+        timestamps = getargs('timestamps', kwargs)
+        self._add_onsets(timestamps)
+
+    def _add_onsets(self, timestamps):
+        """
+        Add presentations at each time in 'timestamps'.
+        """
+        if self.stim_duration is None:
+            raise ValueError("Cannot add presentation to PhotostimulationSeries without 'stim_duration'.")
+
+        timestamps = np.asarray(timestamps, dtype=np.float64).ravel()
+        if self.format in ('interval', 'intervals'):
+            self._add_intervals(timestamps, timestamps + self.stim_duration)
+        else:
+            self._append_events(np.ones(len(timestamps), dtype=np.int8), timestamps)
+
+    def _add_intervals(self, starts, stops):
+        """
+        Interleave the onsets and offsets of the intervals and append them to 'data' and 'timestamps' (or, if format
+        is 'intervals', append the intervals as rows of 'data' and their starts to 'timestamps').
+        """
+        starts = np.asarray(starts, dtype=np.float64).ravel()
+        stops = np.asarray(stops, dtype=np.float64).ravel()
+        if len(starts) != len(stops):
+            raise ValueError("'starts' and 'stops' need to be the same length.")
+        if (stops < starts).any():
+            index = int(np.argmax(stops < starts))
+            raise ValueError(f"Interval {index} stops ({stops[index]:g}) before it starts ({starts[index]:g}).")
+
+        if self.format == 'intervals':
+            self._append_events(np.column_stack((starts, stops)), starts)
+            return
+
+        timestamps = np.empty(2 * len(starts), dtype=np.float64)
+        timestamps[0::2] = starts
+        timestamps[1::2] = stops
+        data = np.empty(2 * len(starts), dtype=np.int8)
+        data[0::2] = 1
+        data[1::2] = -1
+        self._append_events(data, timestamps)
+
+    def _append_events(self, data, timestamps):
+        """
+        Append values to the in-memory 'data' and 'timestamps' buffers, once they are checked to be valid and to
+        follow the current last entry (see validate_appended_events).
+        """
+        if not (isinstance(self.__interval_data, GrowableArray)
+                and isinstance(self.__interval_timestamps, GrowableArray)):
+            raise ValueError("Cannot add stimulus presentations to PhotostimulationSeries without in-memory 'data' "
+                             "and 'timestamps'.")
+        if len(self.__interval_data) > 0:
+            validate_appended_events(self.format, data, timestamps, self.data[-1], self.timestamps[-1])
+        else:
+            validate_appended_events(self.format, data, timestamps)
+        self.__interval_data.extend(data)
+        self.__interval_timestamps.extend(timestamps)
 
     def to_dataframe(self):
         """
         Display 'data' and 'timestamps' side by side as a pandas dataframe. If 'timestamps' is not specified, calculate
-        it using 'rate'.
+        it using 'rate'. If format is 'intervals', display the start and stop time of each presentation. If format is
+        'events', display only the onsets (with a 'data' value of 1), without reconstructing the dense 'series' data.
         """
+        if self.format == 'intervals':
+            if len(self.data) == 0:
+                raise ValueError("No data.")
+            return pd.DataFrame(self.get_intervals(), columns=['start_time', 'stop_time'])
+
         data = np.array(self.data)
-        ts = np.array(self.timestamps)
 
         if len(data) == 0:
             raise ValueError("No data.")
+        if self.format == 'events':
+            data = np.ones(len(data), dtype=np.int8)
 
-        if self.timestamps is None:
-            end = self.starting_time + (1 / self.rate) * (len(data) - 1)
-            ts = np.linspace(self.starting_time, end, num=len(data), endpoint=True)
-
-        df_dict = {'data': data, 'timestamps': ts}
+        df_dict = {'data': data, 'timestamps': np.asarray(self.get_timestamps(), dtype=np.float64)}
         df = pd.DataFrame(df_dict)
         return df
 
-    def _get_start_stop_list(self):
+    def get_intervals(self):
         """
-        Get list of tuples with format (start_time, stop_time) for the onset/offset of stimulus over timeseries.
+        Return an (N, 2) array with the start and stop time (in seconds) of each stimulus presentation. Computed
+        directly from 'data' and 'timestamps' (or 'rate'), without building a dataframe. If format is 'intervals',
+        'data' holds the intervals and is read in a single load. If format is 'events', the onset times are computed
+        from the sample indices in 'data'.
         """
-        df = self.to_dataframe()
+        if self.format == 'intervals':
+            return np.array(self.data[:], dtype=np.float64).reshape(-1, 2)
+        if self.format == 'events':
+            start_times = self.get_timestamps()
+            return np.column_stack((start_times, start_times + self.stim_duration))
+
+        data = np.asarray(self.data)
 
-        start_stop = []
         if self.format == 'interval':
-            start_times = list(df[df['data'] == 1]['timestamps'])
-            end_times = list(df[df['data'] == -1]['timestamps'])
+            timestamps = np.asarray(self.timestamps, dtype=np.float64)
+            start_times = timestamps[data == 1]
+            end_times = timestamps[data == -1]
 
             if len(start_times) != len(end_times):
                 raise ValueError("Number of starts does not equal number of stops.")
+            return np.column_stack((start_times, end_times))
+
+        onsets = np.flatnonzero(data == 1)
+        timestamps = self.get_timestamps()
+        if not isinstance(timestamps, RateTimestamps):
+            timestamps = np.asarray(timestamps, dtype=np.float64)
+        start_times = timestamps[onsets]
+        return np.column_stack((start_times, start_times + self.stim_duration))
+
+    @docval({'name': 't0', 'type': (int, float), 'doc': ("Start of the time window (in seconds).")},
+            {'name': 't1', 'type': (int, float), 'doc': ("End of the time window (in seconds), excluded.")},
+            returns="'data' and 'timestamps' of the entries in the time window", rtype=tuple)
+    def get_events(self, **kwargs):
+        """
+        Return the 'data' and 'timestamps' of the entries with a timestamp in [t0, t1). The window is found by
+        binary search on the sorted timestamps (or computed from 'rate'), so only the entries in the window are read.
+        In-memory 'data' and 'timestamps' are returned as views.
+        """
+        t0, t1 = getargs('t0', 't1', kwargs)
+        start, stop = self._time_window(t0, t1)
+        return self.data[start:stop], self._timestamps_slice(start, stop)
+
+    @docval({'name': 't0', 'type': (int, float), 'doc': ("Start of the time window (in seconds).")},
+            {'name': 't1', 'type': (int, float), 'doc': ("End of the time window (in seconds), excluded.")},
+            {'name': 'name', 'type': str, 'doc': ("Name of the new series. Defaults to the name of this series."),
+             'default': None},
+            returns="series holding the entries in the time window", rtype='PhotostimulationSeries')
+    def slice_time(self, **kwargs):
+        """
+        Return a new PhotostimulationSeries, sharing the pattern of this series, holding the entries with a timestamp
+        in [t0, t1). If format is 'interval', the window is widened to keep the onset and offset of every
+        presentation overlapping it, so that the new series is valid. If format is 'intervals', the presentation that
+        starts before t0 and stops after it is kept as well. If format is 'events', the new series covers the samples
+        of the dense 'series' data in [t0, t1).
+        """
+        t0, t1, name = getargs('t0', 't1', 'name', kwargs)
+        start, stop = self._time_window(t0, t1)
+        if self.format == 'events':
+            return self._slice_events(start, stop, t0, t1, name)
+        if self.format == 'interval':
+            num_events = len(self.data)
+            if 0 < start < num_events and self.data[start] == -1:
+                start -= 1
+            if start < stop < num_events and self.data[stop - 1] == 1:
+                stop += 1
+        elif self.format == 'intervals' and start > 0 and self.data[start - 1][1] > t0:
+            # presentations do not overlap, so only the one before the window can extend into it
+            start -= 1
+
+        series_kwargs = dict()
+        if self.timestamps is None:
+            series_kwargs['rate'] = self.rate
+            series_kwargs['starting_time'] = self.starting_time + start / self.rate
+        elif stop > start:
+            series_kwargs['timestamps'] = np.asarray(self.timestamps[start:stop])
+
+        return PhotostimulationSeries(name=self.name if name is None else name, format=self.format,
+                                      data=np.asarray(self.data[start:stop]), stim_duration=self.stim_duration,
+                                      epoch_length=self.epoch_length, pattern=self.pattern,
+                                      description=self.description, comments=self.comments,
+                                      storage_profile=self.storage_profile, **series_kwargs)
+
+    def _slice_events(self, start, stop, t0, t1, name):
+        """
+        Return a new 'events' series holding the onsets in [start, stop), over the samples of the dense 'series' data
+        with a time in [t0, t1). The indices of the onsets are shifted to the first of those samples.
+        """
+        samples = RateTimestamps(self.starting_time, self.rate, self.dense_length)
+        first, last = int(samples.searchsorted(t0)), int(samples.searchsorted(t1))
+        last = max(first, last)
+        return PhotostimulationSeries(name=self.name if name is None else name, format='events',
+                                      data=np.asarray(self.data[start:stop], dtype=np.int64) - first,
+                                      dense_length=last - first, rate=self.rate,
+                                      starting_time=self.starting_time + first / self.rate,
+                                      stim_duration=self.stim_duration, epoch_length=self.epoch_length,
+                                      pattern=self.pattern, description=self.description, comments=self.comments,
+                                      storage_profile=self.storage_profile)
+
+    @docval({'name': 'format', 'type': str, 'doc': ("Format of the new series."),
+             'enum': ["interval", "intervals", "series", "events"]},
+            {'name': 'name', 'type': str, 'doc': ("Name of the new series. Defaults to the name of this series."),
+             'default': None},
+            returns="series holding the presentations of this series in the new format", rtype='PhotostimulationSeries')
+    def convert_format(self, **kwargs):
+        """
+        Return a new PhotostimulationSeries, sharing the pattern of this series, with its presentations encoded in
+        'format': 'interval' (onsets and offsets in 'data', at the corresponding 'timestamps') or 'intervals' (one
+        [start, stop] row of 'data' per presentation), or 'series' (0 or 1 per sample) or 'events' (the indices of
+        the samples with a value of 1). Conversion is lossless, and only between 'interval' and 'intervals' or between
+        'series' and 'events'. An 'interval' series can only be converted if its onsets and offsets alternate, starting
+        with an onset, and a 'series' series only if it is sampled at 'rate'.
+        """
+        fmt, name = getargs('format', 'name', kwargs)
+        if self.format in ('series', 'events') or fmt in ('series', 'events'):
+            return self._convert_samples(fmt, name)
 
-            for start, end in zip(start_times, end_times):
-                start_stop.append((start, end))
+        if self.format == 'interval':
+            data = np.asarray(self.data)
+            if len(data) > 0 and (len(data) % 2 or not (data[0::2] == 1).all() or not (data[1::2] == -1).all()):
+                raise ValueError(f"Cannot convert series {self.name}, whose onsets and offsets do not alternate "
+                                 f"starting with an onset.")
+            intervals = np.asarray(self.timestamps, dtype=np.float64).reshape(-1, 2)
+        else:
+            intervals = self.get_intervals()
 
-        if self.format == 'series':
-            start_times = list(df[df['data'] == 1]['timestamps'])
+        if fmt == 'intervals':
+            series_kwargs = dict(data=intervals)
+        else:
+            data = np.tile(np.array([1, -1], dtype=np.int8), len(intervals))
+            series_kwargs = dict(data=data, timestamps=intervals.ravel()) if len(data) else dict()
 
-            for start in start_times:
-                start_stop.append((start, start + self.stim_duration))
-        return start_stop
+        return PhotostimulationSeries(name=self.name if name is None else name, format=fmt,
+                                      stim_duration=self.stim_duration, epoch_length=self.epoch_length,
+                                      pattern=self.pattern, description=self.description, comments=self.comments,
+                                      storage_profile=self.storage_profile, **series_kwargs)
+
+    def _convert_samples(self, fmt, name):
+        """
+        Return a new series with the samples of this 'series' or 'events' series encoded in 'fmt' ('series' or
+        'events').
+        """
+        if {self.format, fmt} - {'series', 'events'}:
+            raise ValueError(f"Cannot convert PhotostimulationSeries with 'format' of '{self.format}' to '{fmt}'.")
+        if self.format == 'series' and self.timestamps is not None:
+            raise ValueError(f"Cannot convert series {self.name}, which has 'timestamps' instead of 'rate'.")
+
+        series_kwargs = dict(data=np.asarray(self.data), sparse=fmt == 'events')
+        if self.format == 'events':
+            series_kwargs['data'] = self.dense_data
+        return PhotostimulationSeries(name=self.name if name is None else name, format='series', rate=self.rate,
+                                      starting_time=self.starting_time, stim_duration=self.stim_duration,
+                                      epoch_length=self.epoch_length, pattern=self.pattern,
+                                      description=self.description, comments=self.comments,
+                                      storage_profile=self.storage_profile, **series_kwargs)
+
+    def _time_window(self, t0, t1):
+        """
+        Return the range [start, stop) of the indices of the entries with a timestamp in [t0, t1).
+        """
+        if isinstance(self.data, AbstractDataChunkIterator):
+            raise ValueError(f"Cannot query the time window of series {self.name}, which streams its data from an "
+                             f"iterator.")
+
+        timestamps = self.get_timestamps()
+        start = search_sorted(timestamps, t0)
+        stop = search_sorted(timestamps, t1)
+        return start, max(start, stop)
+
+    def _timestamps_slice(self, start, stop):
+        """
+        Return the timestamps of the entries in [start, stop), computing them from 'rate' if needed.
+        """
+        return self.get_timestamps()[start:stop]
+
+    def get_timestamps(self):
+        """
+        Return 'timestamps' or, for series sampled at 'rate', a RateTimestamps view that computes the timestamps of the
+        samples only when they are indexed or sliced, and searches them analytically. Unlike 'timestamps', which
+        stays None for rate-based series, the result can always be indexed and searched. If format is 'events', return
+        the times of the onsets.
+        """
+        if self.timestamps is not None:
+            return self.timestamps
+        if self.format == 'events':
+            return self.starting_time + np.asarray(self.data, dtype=np.float64) / self.rate
+        if isinstance(self.data, AbstractDataChunkIterator):
+            raise ValueError(f"Cannot compute the timestamps of series {self.name}, which streams its data from an "
+                             f"iterator.")
+        return RateTimestamps(self.starting_time, self.rate, len(self.data))
+
+    def _get_start_stop_list(self):
+        """
+        Get list of tuples with format (start_time, stop_time) for the onset/offset of stimulus over timeseries.
+        """
+        return [tuple(interval) for interval in self.get_intervals().tolist()]
 
     def _get_start_time(self):
         """
@@ -495,7 +897,7 @@ class PhotostimulationSeries(TimeSeries):
         if self.starting_time is not None:
             return self.starting_time
 
-        if self.timestamps is None:
+        if self.timestamps is not None and len(self.timestamps) != 0:
             return self.timestamps[0]
 
         if len(self.data) != 0:
@@ -507,21 +909,46 @@ class PhotostimulationSeries(TimeSeries):
         """
         Returns the final time step value, if it exists.
         """
+        if self.format == 'events':
+            return self.starting_time + (self.dense_length - 1) / self.rate if self.dense_length else np.nan
+
         if len(self.data) == 0:
             return np.nan
 
-        if self.timestamps is None:
-            end = self._get_start_time() + self.stim_duration * (len(self.data) - 1)
-            return end
+        if self.format == 'intervals':
+            return self.data[-1][1]
 
-        return self.timestamps[-1]
+        return self.get_timestamps()[-1]
+
+    @property
+    def num_samples(self):
+        if self.format == 'events':
+            return self.dense_length
+        return super().num_samples
+
+    @property
+    def dense_data(self):
+        """
+        The 0/1 'series' data encoded by 'events' data (or the 'data' of a 'series' series).
+        """
+        if self.format == 'series':
+            return np.asarray(self.data)
+        if self.format != 'events':
+            raise ValueError(f"Series {self.name} with 'format' of '{self.format}' has no dense 'series' data.")
+        dense = np.zeros(self.dense_length, dtype=np.int8)
+        dense[np.asarray(self.data, dtype=np.int64)] = 1
+        return dense
 
     @property
     def data(self):
+        if isinstance(self.__interval_data, GrowableArray):
+            return self.__interval_data.view()
         return self.__interval_data
 
     @property
     def timestamps(self):
+        if isinstance(self.__interval_timestamps, GrowableArray):
+            return self.__interval_timestamps.view()
         return self.__interval_timestamps
 
 
@@ -541,7 +968,8 @@ class PhotostimulationTable(DynamicTable):
          'required': True},
         {'name': 'series_name', 'description': ("Name of the PhotostimulationSeries contained in the row."),
          'required': True},
-        {'name': 'series_format', 'description': ("Format of the PhotostimulationSeries ('interval' or 'series')."),
+        {'name': 'series_format', 'description': ("Format of the PhotostimulationSeries ('interval', 'intervals', "
+                                                  "'series' or 'events')."),
          'required': True},
         {'name': 'num_samples', 'description': ("Number of data points in the series."), 'required': True},
         {'name': 'start_time', 'description': ("Start time of the series."), 'required': True},
@@ -553,14 +981,19 @@ class PhotostimulationTable(DynamicTable):
     )
 
     @docval(*get_docval(DynamicTable.__init__, 'name', 'description'),
-            *get_docval(DynamicTable.__init__, 'id', 'columns', 'colnames'))
+            *get_docval(DynamicTable.__init__, 'id', 'columns', 'colnames'),
+            storage_profile_docval("the ids and columns of the table (except 'series')"))
     def __init__(self, **kwargs):
         keys_to_set = ()
         args_to_set = popargs_to_dict(keys_to_set, kwargs)
+        storage_profile = popargs('storage_profile', kwargs)
 
         super().__init__(**kwargs)
         for key, val in args_to_set.items():
             setattr(self, key, val)
+        self.storage_profile = storage_profile
+        self.__interval_index = None
+        self.__interval_index_rows = 0
 
     @docval({'name': 'series', 'type': (PhotostimulationSeries, Iterable),
              'doc': ("Single 'PhotostimulationSeries', or list of 'PhotostimulationSeries', to add to the table.")},
@@ -586,28 +1019,76 @@ class PhotostimulationTable(DynamicTable):
             for i in range(len(series_list)):
                 row_names_list.append(f"series_{i}")
         else:
-            if not isinstance(row_names_list, Iterable):
+            if isinstance(row_names_list, str) or not isinstance(row_names_list, Iterable):
                 row_names_list = [row_names_list]
 
             if len(row_names_list) != len(series_list):
                 raise ValueError("'series' and 'row_name' must be the same length.")
 
-        for series, name in zip(series_list, row_names_list):
+        for series in series_list:
+            if isinstance(series.data, AbstractDataChunkIterator):
+                raise ValueError(f"Series {series.name} streams its data from an iterator. Write the series to a file "
+                                 f"and add the series read from the file to PhotostimulationTable.")
             if len(series.data) == 0:
                 raise ValueError(f"Series {series.name} has no data. Cannot add to PhotostimulationTable.")
 
-            new_args = {'row_name': name,
-                        'series': series,
-                        'series_name': series.name,
-                        'series_format': series.format,
-                        'num_samples': series.num_samples,
-                        'start_time': float(series._get_start_time()),
-                        'stop_time': float(series._get_end_time()),
-                        'pattern_name': series.pattern.name,
-                        'method_name': series.pattern.method.name
-                        }
+        # compute every column for all of the new rows, then extend each column (and the ids) once
+        new_columns = {'row_name': list(row_names_list),
+                       'series': list(series_list),
+                       'series_name': [series.name for series in series_list],
+                       'series_format': [series.format for series in series_list],
+                       'num_samples': [series.num_samples for series in series_list],
+                       'start_time': [float(series._get_start_time()) for series in series_list],
+                       'stop_time': [float(series._get_end_time()) for series in series_list],
+                       'pattern_name': [series.pattern.name for series in series_list],
+                       'method_name': [series.pattern.method.name for series in series_list]
+                       }
+
+        if set(self.colnames) != set(new_columns):
+            raise ValueError(f"Cannot add series to PhotostimulationTable with columns {self.colnames}.")
+
+        num_rows = len(self)
+        self.id.extend(range(num_rows, num_rows + len(series_list)))
+        for colname, values in new_columns.items():
+            self[colname].extend(values)
+        self.__interval_index = None
+
+    @property
+    def interval_index(self):
+        """
+        IntervalTree of the presentation intervals of the series in every row, labelled by row index. Built on first
+        use, and rebuilt after rows are added.
+        """
+        if self.__interval_index is None or self.__interval_index_rows != len(self):
+            intervals = [self.series[i].get_intervals() for i in range(len(self))]
+            rows = np.repeat(np.arange(len(intervals)), [len(row_intervals) for row_intervals in intervals])
+            intervals = np.concatenate(intervals) if intervals else np.empty((0, 2))
+            self.__interval_index = IntervalTree(intervals[:, 0], intervals[:, 1], rows)
+            self.__interval_index_rows = len(self)
+        return self.__interval_index
+
+    @docval({'name': 'time', 'type': (int, float), 'doc': ("Time (in seconds).")},
+            returns="sorted indices of the rows", rtype=np.ndarray)
+    def get_rows_at(self, **kwargs):
+        """
+        Return the indices of the rows whose series present their stimulus at 'time', i.e., with a presentation
+        interval [start, stop) containing 'time'. Answered from 'interval_index' in logarithmic time; the indices can
+        be used directly to index the table.
+        """
+        time = getargs('time', kwargs)
+        return self.interval_index.stab(time)
 
-            super().add_row(**new_args)
+    @docval({'name': 't0', 'type': (int, float), 'doc': ("Start of the time range (in seconds).")},
+            {'name': 't1', 'type': (int, float), 'doc': ("End of the time range (in seconds), excluded.")},
+            returns="sorted indices of the rows", rtype=np.ndarray)
+    def get_rows_overlapping(self, **kwargs):
+        """
+        Return the indices of the rows whose series present their stimulus at any time in [t0, t1) (e.g., during an
+        imaging frame). Answered from 'interval_index' in logarithmic time; the indices can be used directly to
+        index the table.
+        """
+        t0, t1 = getargs('t0', 't1', kwargs)
+        return self.interval_index.overlap(t0, t1)
 
     @docval({'name': 'figsize', 'type': Iterable, 'doc': ("Width, height in inches (float, float)"), 'default': None},
             {'name': 'xlim', 'type': Iterable, 'doc': ("Set x limits of plot with format [left, right]"), 'default': None})
@@ -616,6 +1097,7 @@ class PhotostimulationTable(DynamicTable):
         Show a plot with each photostimulation series (y-axis), and the timestamp(s) at
         which that pattern was presented (x-axis).
         """
+        import matplotlib.pyplot as plt
 
         if figsize is None:
             fig, ax = plt.subplots()
@@ -626,8 +1108,8 @@ class PhotostimulationTable(DynamicTable):
         y_labels = []
         for i in range(len(self.series)):
             series = self.series[i]
-            start_stop_list = series._get_start_stop_list()
-            start_span_list = [(start, stop-start) for (start,stop) in start_stop_list]
+            intervals = series.get_intervals()
+            start_span_list = np.column_stack((intervals[:, 0], intervals[:, 1] - intervals[:, 0]))
             ax.broken_barh(start_span_list, ((i + 1) * 10, 8))
             y_ticks.append((i + 1) * 10 + 4)
             y_labels.append(self.series_name[i])
@@ -0,0 +1,128 @@
+from hdmf.utils import docval, getargs, get_docval
+
+from .photostim import SpatialLightModulator, Laser, PhotostimulationMethod, HolographicPattern
+
+
+class ContentRegistry:
+    """
+    Registry of containers keyed by their content hash, resolving containers with the same content to the first one
+    registered. A container shared by several parents is written once, as a child of its first parent, and linked
+    from the others.
+    """
+
+    def __init__(self):
+        self.__objects = dict()
+
+    def __len__(self):
+        return len(self.__objects)
+
+    def __iter__(self):
+        return iter(self.__objects.values())
+
+    def __contains__(self, obj):
+        return self.__objects.get(obj.content_hash()) is obj
+
+    def _intern(self, obj):
+        """
+        Return the registered container with the same content as 'obj', registering 'obj' if there is none.
+        """
+        return self.__objects.setdefault(obj.content_hash(), obj)
+
+    def _get_or_create(self, cls, kwargs):
+        """
+        Return the registered container with the content of an instance of 'cls' constructed from 'kwargs',
+        constructing and registering it only if there is none.
+        """
+        key = cls._content_digest(**kwargs)
+        if key not in self.__objects:
+            self.__objects[key] = cls(**kwargs)
+        return self.__objects[key]
+
+
+class PatternRegistry(ContentRegistry):
+    """
+    Registry of HolographicPattern objects. Series built with the patterns returned by 'register' share one stored
+    pattern per distinct content, e.g.
+
+        registry = PatternRegistry()
+        series = PhotostimulationSeries(..., pattern=registry.register(HolographicPattern(...)))
+    """
+
+    @docval({'name': 'pattern', 'type': HolographicPattern, 'doc': ("HolographicPattern to register.")},
+            returns="the registered pattern with the same content", rtype=HolographicPattern)
+    def register(self, **kwargs):
+        """
+        Return the registered pattern with the same content (see HolographicPattern.content_hash) as 'pattern',
+        registering 'pattern' if there is none.
+        """
+        pattern = getargs('pattern', kwargs)
+        return self._intern(pattern)
+
+
+class MethodRegistry(ContentRegistry):
+    """
+    Registry of PhotostimulationMethod, SpatialLightModulator and Laser objects, interned by their field values
+    (excluding names). Patterns built with the methods from the registry share one stored method per distinct method,
+    and methods share one stored device per distinct device, e.g.
+
+        registry = MethodRegistry()
+        method = registry.get_method(name='method', ..., slm=registry.get_slm(name='slm', ...),
+                                     laser=registry.get_laser(name='laser', ...))
+        pattern = HolographicPattern(..., method=method)
+
+    The 'get_*' methods construct a container only the first time its field values are seen, so building many
+    patterns takes time and memory proportional to the number of distinct methods and devices.
+    """
+
+    @docval(*get_docval(SpatialLightModulator.__init__),
+            returns="the registered SpatialLightModulator with the given field values", rtype=SpatialLightModulator)
+    def get_slm(self, **kwargs):
+        """
+        Return the registered SpatialLightModulator with the given field values, creating it if there is none.
+        """
+        return self._get_or_create(SpatialLightModulator, kwargs)
+
+    @docval(*get_docval(Laser.__init__),
+            returns="the registered Laser with the given field values", rtype=Laser)
+    def get_laser(self, **kwargs):
+        """
+        Return the registered Laser with the given field values, creating it if there is none.
+        """
+        return self._get_or_create(Laser, kwargs)
+
+    @docval(*get_docval(PhotostimulationMethod.__init__),
+            returns="the registered PhotostimulationMethod with the given field values", rtype=PhotostimulationMethod)
+    def get_method(self, **kwargs):
+        """
+        Return the registered PhotostimulationMethod with the given field values, creating it if there is none. The
+        SLM and laser are registered first, so methods with devices of the same field values share those devices.
+        """
+        for key in ('slm', 'laser'):
+            if kwargs[key] is not None:
+                kwargs[key] = self._intern(kwargs[key])
+        return self._get_or_create(PhotostimulationMethod, kwargs)
+
+    @docval({'name': 'container', 'type': (SpatialLightModulator, Laser, PhotostimulationMethod),
+             'doc': ("SpatialLightModulator, Laser or PhotostimulationMethod to register.")},
+            returns="the registered container with the same field values",
+            rtype=(SpatialLightModulator, Laser, PhotostimulationMethod))
+    def register(self, **kwargs):
+        """
+        Return the registered container with the same field values as 'container', registering it if there is none.
+        The SLM and laser of a method are registered with it; if they resolve to previously registered devices, a new
+        method with the same field values using those devices is registered and returned instead, since the devices
+        of a method can only be set once.
+        """
+        container = getargs('container', kwargs)
+        if not isinstance(container, PhotostimulationMethod):
+            return self._intern(container)
+
+        slm = None if container.slm is None else self._intern(container.slm)
+        laser = None if container.laser is None else self._intern(container.laser)
+        if slm is container.slm and laser is container.laser:
+            return self._intern(container)
+        return self.get_method(name=container.name, stimulus_method=container.stimulus_method,
+                               sweep_pattern=container.sweep_pattern, sweep_size=container.sweep_size,
+                               time_per_sweep=container.time_per_sweep, num_sweeps=container.num_sweeps,
+                               power_per_target=container.power_per_target, opsin=container.opsin, slm=slm,
+                               laser=laser)
@@ -0,0 +1,98 @@
+import bisect
+
+import numpy as np
+
+
+def search_sorted(values, t, side='left'):
+    """
+    Return the index at which time 't' would be inserted into the sorted 1D 'values' to keep it sorted, following
+    np.searchsorted. Arrays in memory are searched with numpy and RateTimestamps analytically; other sequences (e.g.,
+    h5py datasets) are bisected, so only the O(log N) probed values are read from the file.
+    """
+    if isinstance(values, np.ndarray):
+        return int(np.searchsorted(values, t, side=side))
+    if isinstance(values, RateTimestamps):
+        return values.searchsorted(t, side=side)
+    if side == 'left':
+        return bisect.bisect_left(values, t)
+    return bisect.bisect_right(values, t)
+
+
+def rate_search_sorted(starting_time, rate, num_samples, t, side='left'):
+    """
+    As 'search_sorted', for the 'num_samples' uniformly sampled times 'starting_time + i / rate', and for a single
+    time or an array of times 't'. Indices are computed analytically, then corrected for rounding so that they are
+    consistent with the sample times.
+    """
+    def before(i):
+        time = starting_time + i / rate
+        return time < t if side == 'left' else time <= t
+
+    t = np.asarray(t, dtype=np.float64)
+    index = np.clip(np.ceil((t - starting_time) * rate), 0, num_samples).astype(np.intp)
+    # rounding moves the computed index by at most one sample
+    index = np.where((index > 0) & ~before(index - 1), index - 1, index)
+    index = np.where((index < num_samples) & before(index), index + 1, index)
+    return int(index) if index.ndim == 0 else index
+
+
+class RateTimestamps:
+    """
+    Read-only view of the timestamps 'starting_time + i / rate' of the 'num_samples' samples of a uniformly sampled
+    series. Timestamps are computed only for the indices or slices requested, and 'searchsorted' is answered
+    analytically, so no array of timestamps is allocated for the whole series. Converting the view to an array
+    (e.g., with np.asarray) computes every timestamp.
+    """
+
+    dtype = np.dtype(np.float64)
+    ndim = 1
+
+    def __init__(self, starting_time, rate, num_samples):
+        self.starting_time = float(starting_time)
+        self.rate = float(rate)
+        self.num_samples = int(num_samples)
+
+    def __len__(self):
+        return self.num_samples
+
+    @property
+    def shape(self):
+        return (self.num_samples,)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.__times(np.arange(*key.indices(self.num_samples)))
+        if isinstance(key, (int, np.integer)):
+            index = int(key) + self.num_samples if key < 0 else int(key)
+            if not 0 <= index < self.num_samples:
+                raise IndexError(f"index {key} is out of bounds for timestamps of length {self.num_samples}")
+            return float(self.__times(index))
+
+        index = np.asarray(key)
+        if index.dtype == bool:
+            index = np.flatnonzero(index)
+        index = np.where(index < 0, index + self.num_samples, index)
+        if ((index < 0) | (index >= self.num_samples)).any():
+            raise IndexError(f"index out of bounds for timestamps of length {self.num_samples}")
+        return self.__times(index)
+
+    def __times(self, index):
+        return self.starting_time + index / self.rate
+
+    def __array__(self, dtype=None, copy=None):
+        times = self[:]
+        return times if dtype is None else times.astype(dtype)
+
+    def __iter__(self):
+        for start in range(0, self.num_samples, 4096):
+            yield from self[start:start + 4096].tolist()
+
+    def __repr__(self):
+        return (f"{type(self).__name__}(starting_time={self.starting_time}, rate={self.rate}, "
+                f"num_samples={self.num_samples})")
+
+    def searchsorted(self, t, side='left'):
+        """
+        As np.searchsorted, computing the indices from 'starting_time' and 'rate' (see 'rate_search_sorted').
+        """
+        return rate_search_sorted(self.starting_time, self.rate, self.num_samples, t, side=side)
@@ -0,0 +1,94 @@
+import warnings
+
+import h5py
+import numpy as np
+from hdmf.backends.hdf5.h5_utils import H5DataIO
+from hdmf.data_utils import AbstractDataChunkIterator, DataIO
+
+# HDF5 storage settings of each profile. 'chunk_bytes' is the target size of a chunk, from which the chunk shape of
+# each dataset is derived.
+#   archive: smallest files, using gzip and the shuffle filter over large chunks
+#   fast: lzf (built into h5py, no plugin needed) and the shuffle filter over medium chunks, for fast writes and reads
+#   scan: uncompressed small chunks along time (one plane per chunk for 3D masks), for reading short time windows
+STORAGE_PROFILES = {
+    'archive': {'compression': 'gzip', 'compression_opts': 6, 'shuffle': True, 'chunk_bytes': 2 ** 20},
+    'fast': {'compression': 'lzf', 'shuffle': True, 'chunk_bytes': 2 ** 18},
+    'scan': {'chunk_bytes': 2 ** 14},
+}
+
+
+def storage_profile_docval(target):
+    """
+    Return the docval entry of the 'storage_profile' argument of a class whose 'target' datasets are stored with
+    the profile.
+    """
+    return {'name': 'storage_profile', 'type': str,
+            'doc': (f"HDF5 storage profile applied to {target} when written: 'archive' (gzip and shuffle), 'fast' "
+                    "(lzf and shuffle) or 'scan' (uncompressed, chunked along time). Chunk shapes are derived from "
+                    "the size of each dataset. If None, datasets are written contiguous and uncompressed."),
+            'default': None, 'enum': list(STORAGE_PROFILES)}
+
+
+def chunk_shape(shape, itemsize, chunk_bytes, plane_axis=None):
+    """
+    Derive the chunk shape of a dataset of size 'shape' (None for unlimited axes) whose chunks should hold at most
+    'chunk_bytes', by shortening the longest axis of the chunk until it fits. If 'plane_axis' is given, each chunk
+    holds a single plane along that axis.
+    """
+    max_values = max(1, chunk_bytes // max(1, itemsize))
+    chunks = [max_values if s is None else max(1, int(s)) for s in shape]
+    if plane_axis is not None:
+        chunks[plane_axis] = 1
+    while np.prod(chunks) > max_values and max(chunks) > 1:
+        axis = int(np.argmax(chunks))
+        others = int(np.prod(chunks)) // chunks[axis]
+        if others <= max_values:
+            # the other axes fit, so fill the chunk along the longest axis
+            chunks[axis] = max_values // others
+        else:
+            chunks[axis] = (chunks[axis] + 1) // 2
+    return tuple(chunks)
+
+
+def dataset_io_settings(data, profile, plane_axis=None):
+    """
+    Return the H5DataIO settings of the storage profile 'profile' for 'data', with a chunk shape derived from the
+    size of 'data', or None if 'data' is empty or read from a file.
+    """
+    if isinstance(data, h5py.Dataset):
+        return None
+
+    settings = dict(STORAGE_PROFILES[profile])
+    chunk_bytes = settings.pop('chunk_bytes')
+    if isinstance(data, AbstractDataChunkIterator):
+        shape, itemsize = data.maxshape, np.dtype(data.dtype).itemsize
+    else:
+        array = np.asarray(data)
+        if array.size == 0:
+            return None
+        shape, itemsize = array.shape, array.dtype.itemsize
+    settings['chunks'] = chunk_shape(shape, itemsize, chunk_bytes, plane_axis)
+    return settings
+
+
+def wrap_dataset(data, profile, plane_axis=None):
+    """
+    Wrap 'data' in H5DataIO with the settings of the storage profile 'profile'. Data that are empty, read from a
+    file or already wrapped are returned as is.
+    """
+    if profile is None or data is None or isinstance(data, DataIO):
+        return data
+
+    settings = dataset_io_settings(data, profile, plane_axis)
+    if settings is None:
+        return data
+    return h5_data_io(data=data, **settings)
+
+
+def h5_data_io(**kwargs):
+    """
+    Construct H5DataIO, without warning that lzf compression (used by the 'fast' profile) is specific to h5py.
+    """
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='lzf compression may not be available')
+        return H5DataIO(**kwargs)
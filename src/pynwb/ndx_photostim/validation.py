@@ -0,0 +1,229 @@
+import numpy as np
+from hdmf.utils import get_data_shape
+
+from .iterators import FORMAT_VALUES
+
+# messages raised when 'data' holds values outside those allowed for its format
+FORMAT_ERRORS = {'interval': "'interval' data must be either -1 (offset) or 1 (onset).",
+                 'series': "'series' data must be either 0 or 1."}
+
+
+def validate_events(fmt, data, timestamps=None):
+    """
+    Check the 'data' and 'timestamps' of a PhotostimulationSeries with format 'fmt' in O(N) time, without sorting:
+    every value of 'data' is one allowed for the format, 'interval' data starts with an onset and alternates strictly
+    between onsets and offsets (no two consecutive entries are equal), and 'timestamps' are non-decreasing.
+    'intervals' data must hold non-overlapping [start, stop] rows in time order, whose starts are the 'timestamps'.
+    Returns 'data' and 'timestamps' as arrays, so that they are converted only once.
+    """
+    if fmt == 'intervals':
+        return _validate_intervals(data, timestamps)
+
+    data = np.asarray(data)
+    low, high = FORMAT_VALUES[fmt]
+    if not ((data == low) | (data == high)).all():
+        raise ValueError(FORMAT_ERRORS[fmt])
+    if fmt == 'interval' and len(data) > 0 and data[0] != 1:
+        raise ValueError("'interval' data must start with an onset (1), but starts with an offset (-1).")
+    if fmt == 'interval' and (data[1:] == data[:-1]).any():
+        index = int(np.argmax(data[1:] == data[:-1]))
+        raise ValueError(f"'interval' data must alternate between onsets (1) and offsets (-1), but entries {index} "
+                         f"and {index + 1} are both {data[index]:g}.")
+
+    if timestamps is not None:
+        timestamps = validate_timestamps(timestamps)
+    return data, timestamps
+
+
+def validate_timestamps(timestamps):
+    """
+    Check that 'timestamps' are non-decreasing. Returns 'timestamps' as a float array.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if (timestamps[1:] < timestamps[:-1]).any():
+        index = int(np.argmax(timestamps[1:] < timestamps[:-1]))
+        raise ValueError(f"'timestamps' must be non-decreasing, but timestamp {index + 1} "
+                         f"({timestamps[index + 1]:g}) is before timestamp {index} ({timestamps[index]:g}).")
+    return timestamps
+
+
+def validate_appended_events(fmt, data, timestamps, last_value=None, last_timestamp=None):
+    """
+    Check 'data' and 'timestamps' appended to a PhotostimulationSeries with format 'fmt' in O(k) time for k appended
+    entries: the new entries are checked as by validate_events, and must follow the current last entry, with value
+    'last_value' (the last row, for 'intervals' data) at 'last_timestamp' (both None if the series is empty).
+    Returns 'data' and 'timestamps' as arrays.
+    """
+    data, timestamps = validate_events(fmt, data, timestamps)
+    if len(data) == 0 or last_value is None:
+        return data, timestamps
+
+    if fmt == 'intervals':
+        if data[0, 0] < last_value[1]:
+            raise ValueError(f"Cannot add a presentation starting at {data[0, 0]:g}, before the end of the last "
+                             f"presentation ({last_value[1]:g}).")
+        return data, timestamps
+
+    if timestamps[0] < last_timestamp:
+        raise ValueError(f"Cannot add entries from {timestamps[0]:g}, before the last timestamp "
+                         f"({last_timestamp:g}).")
+    if fmt == 'interval' and data[0] == last_value:
+        raise ValueError(f"'interval' data must alternate between onsets (1) and offsets (-1), but the last entry "
+                         f"and the first added entry are both {data[0]:g}.")
+    return data, timestamps
+
+
+def _validate_intervals(data, timestamps=None):
+    """
+    Check that the rows of 'intervals' data are non-overlapping [start, stop] intervals in time order, i.e., that
+    the flattened rows are non-decreasing, and that 'timestamps' (if given) are the starts of the intervals.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    flat = data.ravel()
+    if (flat[1:] < flat[:-1]).any():
+        index = int(np.argmax(flat[1:] < flat[:-1])) + 1
+        raise ValueError(f"'intervals' data must hold non-overlapping [start, stop] rows in time order, but row "
+                         f"{index // 2} is not.")
+
+    if timestamps is not None:
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if not np.array_equal(timestamps, data[:, 0]):
+            raise ValueError("'timestamps' of 'intervals' data must be the start times of the intervals.")
+    return data, timestamps
+
+
+def validate_event_indices(data, dense_length):
+    """
+    Check that 'events' data holds strictly increasing integer indices of samples of dense 'series' data of
+    'dense_length' samples. Returns 'data' as an integer array.
+    """
+    data = np.asarray(data)
+    if len(data) == 0:
+        return data.astype(np.int64)
+    if not (np.issubdtype(data.dtype, np.integer) or (data == np.round(data)).all()):
+        raise ValueError("'events' data must hold integer sample indices.")
+    data = data.astype(np.int64)
+    if (data[1:] <= data[:-1]).any():
+        raise ValueError("'events' data must hold strictly increasing sample indices.")
+    if data[0] < 0 or data[-1] >= dense_length:
+        raise ValueError(f"'events' data must hold sample indices in [0, {dense_length}).")
+    return data
+
+
+def check_format_args(kwargs, validate=True):
+    """
+    Check the arguments of a PhotostimulationSeries with in-memory 'data' for its format (see the 'check_*_args'
+    function of each format), validating the values of 'data' and 'timestamps' if 'validate' is True. Arguments
+    are completed or converted in place in 'kwargs'.
+    """
+    FORMAT_ARG_CHECKS[kwargs['format']](kwargs, validate)
+
+
+def check_interval_args(kwargs, validate=True):
+    """
+    Check the arguments of an 'interval' series: non-empty 'data' needs 'timestamps' of the same length.
+    """
+    _check_1d(kwargs)
+    if len(kwargs['data']) == 0:
+        if kwargs['timestamps'] is not None:
+            raise ValueError("'timestamps' can't be specified without corresponding 'data'.")
+        kwargs['timestamps'] = []
+        return
+
+    if kwargs['timestamps'] is None:
+        raise ValueError("Need to specify corresponding 'timestamps' for each entry in 'data'.")
+    if len(kwargs['data']) != len(kwargs['timestamps']):
+        raise ValueError("'data' and 'timestamps' need to be the same length.")
+    if validate:
+        _validate_event_args(kwargs)
+
+
+def check_intervals_args(kwargs, validate=True):
+    """
+    Check the arguments of an 'intervals' series: 'data' holds one [start, stop] row per presentation, and
+    'timestamps' (the starts, computed from 'data' if not given) must be as long as 'data'.
+    """
+    if len(kwargs['data']) == 0:
+        if kwargs['timestamps'] is not None and len(kwargs['timestamps']) > 0:
+            raise ValueError("'timestamps' can't be specified without corresponding 'data'.")
+        kwargs['data'] = np.empty((0, 2))
+        kwargs['timestamps'] = []
+        return
+
+    if isinstance(kwargs['data'], (list, tuple)):
+        kwargs['data'] = np.asarray(kwargs['data'], dtype=np.float64)
+    shape = get_data_shape(kwargs['data'])
+    if len(shape) != 2 or shape[1] != 2:
+        raise ValueError("'intervals' data must have one row of [start, stop] times per presentation.")
+
+    # the timestamps of the intervals are their start times
+    if kwargs['timestamps'] is None:
+        kwargs['timestamps'] = np.asarray(kwargs['data'][:, 0], dtype=np.float64)
+    if len(kwargs['data']) != len(kwargs['timestamps']):
+        raise ValueError("'data' and 'timestamps' need to be the same length.")
+    if validate:
+        _validate_event_args(kwargs)
+
+
+def check_series_args(kwargs, validate=True):
+    """
+    Check the arguments of a 'series' series: 'stim_duration' is required, and non-empty 'data' needs either
+    'timestamps' of the same length or 'rate'.
+    """
+    _check_1d(kwargs)
+    if kwargs['stim_duration'] is None:
+        raise ValueError("If 'format' is 'series', 'stim_duration' must be specified.")
+
+    if len(kwargs['data']) == 0:
+        if kwargs['timestamps'] is not None:
+            raise ValueError("'timestamps' can't be specified without corresponding 'data'.")
+        if kwargs['rate'] is None:
+            kwargs['timestamps'] = []
+        return
+
+    if kwargs['timestamps'] is None and kwargs['rate'] is None:
+        raise ValueError("Either 'timestamps' or 'rate' must be specified.")
+    if kwargs['timestamps'] is not None and len(kwargs['data']) != len(kwargs['timestamps']):
+        raise ValueError("'data' and 'timestamps' need to be the same length.")
+    if validate:
+        _validate_event_args(kwargs)
+
+
+def check_events_args(kwargs, validate=True):
+    """
+    Check the arguments of an 'events' series: 'stim_duration', 'rate' (and not 'timestamps') and 'dense_length'
+    are required, and 'data' holds valid sample indices (see validate_event_indices).
+    """
+    _check_1d(kwargs)
+    if kwargs['stim_duration'] is None:
+        raise ValueError("If 'format' is 'events', 'stim_duration' must be specified.")
+    if kwargs['rate'] is None or kwargs['timestamps'] is not None:
+        raise ValueError("If 'format' is 'events', 'rate' (and not 'timestamps') must be specified.")
+    if kwargs['dense_length'] is None:
+        raise ValueError("If 'format' is 'events', 'dense_length' must be specified.")
+
+    if validate:
+        data = validate_event_indices(kwargs['data'], kwargs['dense_length'])
+        if isinstance(kwargs['data'], (list, tuple)):
+            kwargs['data'] = data
+
+
+FORMAT_ARG_CHECKS = {'interval': check_interval_args, 'intervals': check_intervals_args,
+                     'series': check_series_args, 'events': check_events_args}
+
+
+def _check_1d(kwargs):
+    if len(get_data_shape(kwargs['data'])) != 1:
+        raise ValueError(f"'{kwargs['format']}' data must be 1D.")
+
+
+def _validate_event_args(kwargs):
+    """
+    Validate 'data' and 'timestamps' in a single O(N) pass (see validate_events). 'data' and 'timestamps' given in
+    memory are replaced by the arrays converted for the check, so they are not converted again.
+    """
+    data, timestamps = validate_events(kwargs['format'], kwargs['data'], kwargs['timestamps'])
+    if isinstance(kwargs['data'], (list, tuple)):
+        kwargs['data'] = data
+    if isinstance(kwargs['timestamps'], (list, tuple)):
+        kwargs['timestamps'] = timestamps
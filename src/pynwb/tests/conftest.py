@@ -0,0 +1,11 @@
+import os
+import shutil
+import tempfile
+
+# cache the parsed spec files of the imported extension in a temporary directory rather than the user's cache
+_cache_dir = tempfile.mkdtemp(prefix='ndx-photostim-cache-')
+os.environ['NDX_PHOTOSTIM_CACHE_DIR'] = _cache_dir
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_cache_dir, ignore_errors=True)
@@ -1,11 +1,14 @@
 import os
 from datetime import datetime
 
+import h5py
 import numpy as np
 from dateutil.tz import tzlocal
+from hdmf.data_utils import DataChunkIterator
 from ndx_photostim import SpatialLightModulator, Laser, PhotostimulationMethod, HolographicPattern, \
-                             PhotostimulationSeries, PhotostimulationTable
-from pynwb import NWBFile, NWBHDF5IO
+                             PhotostimulationSeries, PhotostimulationTable, MethodRegistry, PatternRegistry, \
+                             extract_peristim_windows
+from pynwb import NWBFile, NWBHDF5IO, TimeSeries
 from pynwb.testing import TestCase
 
 
@@ -68,7 +71,7 @@ class TestIO(TestCase):
                                     pattern=hp)
         s2 = PhotostimulationSeries(name="series_2",
                                     format='interval',
-                                    data=[-1, 1, -1, 1],
+                                    data=[1, -1, 1, -1],
                                     timestamps=[0.4, 0.9, 1.9, 3.9],
                                     pattern=hp)
         s3 = PhotostimulationSeries(name="series_3",
@@ -102,3 +105,305 @@ class TestIO(TestCase):
         # cleanup workspace
         if os.path.exists(self.path):
             os.remove(self.path)
+
+    def test_roundtrip_sparse_mask(self):
+        """
+        Write a HolographicPattern stored as 'sparse_mask_roi' and check the dense mask can be recovered on read.
+        """
+        ps_method = PhotostimulationMethod(name="methodA")
+        image_mask_roi = np.zeros((64, 64))
+        image_mask_roi[10:14, 20:24] = 1
+        hp = HolographicPattern(name='pattern', image_mask_roi=image_mask_roi, sparse=True, method=ps_method)
+        series = PhotostimulationSeries(name="series_1", format='interval', data=[1, -1], timestamps=[0.5, 1],
+                                        pattern=hp)
+        self.nwbfile.add_stimulus(series)
+
+        with NWBHDF5IO(self.path, "w") as io:
+            io.write(self.nwbfile)
+
+        with NWBHDF5IO(self.path, mode='r', load_namespaces=True) as io:
+            read_pattern = io.read().stimulus['series_1'].pattern
+            self.assertIsNone(read_pattern.image_mask_roi)
+            np.testing.assert_array_equal(read_pattern.image_mask, image_mask_roi)
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_roundtrip_added_intervals(self):
+        """
+        Check that presentations added after construction are written to file.
+        """
+        ps_method = PhotostimulationMethod(name="methodA")
+        hp = HolographicPattern(name='pattern', image_mask_roi=np.round(np.random.rand(5, 5)), method=ps_method)
+        series = PhotostimulationSeries(name="series_1", format='interval', pattern=hp, stim_duration=0.5)
+        series.add_interval(1., 2.)
+        series.add_onset([3., 4.])
+        self.nwbfile.add_stimulus(series)
+
+        with NWBHDF5IO(self.path, "w") as io:
+            io.write(self.nwbfile)
+
+        with NWBHDF5IO(self.path, mode='r', load_namespaces=True) as io:
+            read_series = io.read().stimulus['series_1']
+            np.testing.assert_array_equal(read_series.data[:], [1, -1, 1, -1, 1, -1])
+            np.testing.assert_array_equal(read_series.timestamps[:], [1., 2., 3., 3.5, 4., 4.5])
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_roundtrip_streamed_series(self):
+        """
+        Check that a series whose data and timestamps are streamed from iterators is written to file.
+        """
+        def data():
+            for _ in range(500):
+                yield from (1, -1)
+
+        def timestamps():
+            for i in range(500):
+                yield from (2. * i, 2. * i + 1)
+
+        ps_method = PhotostimulationMethod(name="methodA")
+        hp = HolographicPattern(name='pattern', image_mask_roi=np.round(np.random.rand(5, 5)), method=ps_method)
+        series = PhotostimulationSeries(name="series_1", format='interval', pattern=hp,
+                                        data=DataChunkIterator(data=data(), buffer_size=64),
+                                        timestamps=DataChunkIterator(data=timestamps(), buffer_size=64))
+        self.nwbfile.add_stimulus(series)
+
+        with NWBHDF5IO(self.path, "w") as io:
+            io.write(self.nwbfile)
+
+        with NWBHDF5IO(self.path, mode='r', load_namespaces=True) as io:
+            read_series = io.read().stimulus['series_1']
+            np.testing.assert_array_equal(read_series.data[:], np.tile([1, -1], 500))
+            np.testing.assert_array_equal(read_series.timestamps[:], np.arange(1000.))
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_roundtrip_unvalidated(self):
+        """
+        Check that a series is read back without validating its data, e.g., from files written by earlier versions
+        that allowed unsorted timestamps.
+        """
+        ps_method = PhotostimulationMethod(name="methodA")
+        hp = HolographicPattern(name='pattern', image_mask_roi=np.round(np.random.rand(5, 5)), method=ps_method)
+        series = PhotostimulationSeries(name="series_1", format='interval', pattern=hp, data=[1, -1, 1, -1],
+                                        timestamps=[3., 4., 0., 1.], validate=False)
+        self.nwbfile.add_stimulus(series)
+
+        with NWBHDF5IO(self.path, "w") as io:
+            io.write(self.nwbfile)
+
+        with NWBHDF5IO(self.path, mode='r', load_namespaces=True) as io:
+            read_series = io.read().stimulus['series_1']
+            np.testing.assert_array_equal(read_series.timestamps[:], [3., 4., 0., 1.])
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_roundtrip_intervals(self):
+        """
+        Check that a series with 'intervals' format is written as a 2D dataset and read back losslessly.
+        """
+        ps_method = PhotostimulationMethod(name="methodA")
+        hp = HolographicPattern(name='pattern', image_mask_roi=np.round(np.random.rand(5, 5)), method=ps_method)
+        series = PhotostimulationSeries(name="series_1", format='intervals', pattern=hp, data=[[0.5, 1], [2, 4]])
+        self.nwbfile.add_stimulus(series)
+
+        with NWBHDF5IO(self.path, "w") as io:
+            io.write(self.nwbfile)
+
+        with NWBHDF5IO(self.path, mode='r', load_namespaces=True) as io:
+            read_series = io.read().stimulus['series_1']
+            assert read_series.format == 'intervals'
+            assert read_series.data.shape == (2, 2)
+            # the start times are stored once, in 'data'
+            assert 'timestamps' not in io._file['stimulus/presentation/series_1']
+            np.testing.assert_array_equal(read_series.timestamps, [0.5, 2])
+            np.testing.assert_array_equal(read_series.get_intervals(), [[0.5, 1], [2, 4]])
+            converted = read_series.convert_format('interval')
+            np.testing.assert_array_equal(converted.data, [1, -1, 1, -1])
+            np.testing.assert_array_equal(converted.timestamps, [0.5, 1, 2, 4])
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_roundtrip_events(self):
+        """
+        Check that 'series' data stored as 'events' is written as sample indices and read back losslessly.
+        """
+        ps_method = PhotostimulationMethod(name="methodA")
+        hp = HolographicPattern(name='pattern', image_mask_roi=np.round(np.random.rand(5, 5)), method=ps_method)
+        dense = np.zeros(1000, dtype=np.int8)
+        dense[[10, 500, 999]] = 1
+        series = PhotostimulationSeries(name="series_1", format='series', pattern=hp, data=dense, rate=100.,
+                                        stim_duration=0.005, sparse=True)
+        self.nwbfile.add_stimulus(series)
+
+        with NWBHDF5IO(self.path, "w") as io:
+            io.write(self.nwbfile)
+
+        with NWBHDF5IO(self.path, mode='r', load_namespaces=True) as io:
+            read_series = io.read().stimulus['series_1']
+            assert read_series.format == 'events'
+            assert read_series.dense_length == 1000
+            np.testing.assert_array_equal(read_series.data[:], [10, 500, 999])
+            np.testing.assert_array_equal(read_series.dense_data, dense)
+            np.testing.assert_allclose(read_series.get_intervals()[:, 0], [0.1, 5, 9.99])
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_roundtrip_storage_profile(self):
+        """
+        Check that the storage profile sets the chunking and compression of the datasets, and that the data are read
+        back unchanged.
+        """
+        ps_method = PhotostimulationMethod(name="methodA")
+        mask = np.round(np.random.rand(64, 64, 3))
+        hp = HolographicPattern(name='pattern', image_mask_roi=mask, method=ps_method, storage_profile='archive')
+        series = PhotostimulationSeries(name="series_1", format='interval', pattern=hp, stim_duration=0.5,
+                                        storage_profile='scan')
+        series.add_onsets(np.arange(5000.))
+        self.nwbfile.add_stimulus(series)
+        sp_table = PhotostimulationTable(name='test', description='test table', storage_profile='fast')
+        sp_table.add_series(series)
+        self.nwbfile.add_acquisition(sp_table)
+
+        with NWBHDF5IO(self.path, "w") as io:
+            io.write(self.nwbfile)
+
+        with h5py.File(self.path, 'r') as f:
+            mask_dset = f['stimulus/presentation/series_1/pattern/image_mask_roi']
+            assert mask_dset.compression == 'gzip' and mask_dset.shuffle
+            assert mask_dset.chunks == (64, 64, 1)
+            assert f['stimulus/presentation/series_1/timestamps'].chunks == (2048,)
+            assert f['acquisition/test/start_time'].compression == 'lzf'
+
+        with NWBHDF5IO(self.path, mode='r', load_namespaces=True) as io:
+            read_series = io.read().stimulus['series_1']
+            np.testing.assert_array_equal(read_series.pattern.image_mask_roi[:], mask)
+            np.testing.assert_array_equal(read_series.timestamps[::2], np.arange(5000.))
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_time_window_from_file(self):
+        """
+        Check that time windows of a series read from file are found without reading the whole series.
+        """
+        ps_method = PhotostimulationMethod(name="methodA")
+        hp = HolographicPattern(name='pattern', image_mask_roi=np.round(np.random.rand(5, 5)), method=ps_method)
+        series = PhotostimulationSeries(name="series_1", format='interval', pattern=hp, stim_duration=0.5)
+        series.add_onsets(np.arange(1000.))
+        self.nwbfile.add_stimulus(series)
+
+        with NWBHDF5IO(self.path, "w") as io:
+            io.write(self.nwbfile)
+
+        with NWBHDF5IO(self.path, mode='r', load_namespaces=True) as io:
+            read_series = io.read().stimulus['series_1']
+            assert isinstance(read_series.timestamps, h5py.Dataset)
+            data, timestamps = read_series.get_events(500.25, 502.)
+            np.testing.assert_array_equal(data, [-1, 1, -1])
+            np.testing.assert_array_equal(timestamps, [500.5, 501., 501.5])
+            window = read_series.slice_time(500.25, 502., name='window')
+            np.testing.assert_array_equal(window.get_intervals(), [[500., 500.5], [501., 501.5]])
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_peristim_windows_from_file(self):
+        """
+        Check that peri-stimulus windows read in blocks from a response stored in file match those gathered in memory.
+        """
+        ps_method = PhotostimulationMethod(name="methodA")
+        hp = HolographicPattern(name='pattern', image_mask_roi=np.round(np.random.rand(5, 5)), method=ps_method)
+        series = PhotostimulationSeries(name="series_1", format='interval', pattern=hp, stim_duration=0.5)
+        # non-overlapping presentations, some of them before the start or after the end of the response
+        series.add_onsets(np.arange(-1, 101, 0.6) + np.random.uniform(0, 0.1, 170))
+        data = np.random.rand(3000, 4)
+        response = TimeSeries(name='response', data=data, unit='a.u.', timestamps=np.arange(3000) / 30.)
+        self.nwbfile.add_stimulus(series)
+        self.nwbfile.add_acquisition(response)
+        expected, _ = extract_peristim_windows(series, response, 0.5, 1.)
+
+        with NWBHDF5IO(self.path, "w") as io:
+            io.write(self.nwbfile)
+
+        with NWBHDF5IO(self.path, mode='r', load_namespaces=True) as io:
+            read_nwbfile = io.read()
+            read_response = read_nwbfile.acquisition['response']
+            assert isinstance(read_response.data, h5py.Dataset)
+            windows, _ = extract_peristim_windows(read_nwbfile.stimulus['series_1'], read_response, 0.5, 1.,
+                                                  chunk_frames=100)
+            np.testing.assert_array_equal(windows, expected)
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_roundtrip_shared_pattern(self):
+        """
+        Check that a registered pattern shared by several series is written once and read back as a single pattern.
+        """
+        ps_method = PhotostimulationMethod(name="methodA")
+        registry = PatternRegistry()
+        masks = [np.round(np.random.rand(16, 16)) for _ in range(2)]
+        for i in range(6):
+            hp = registry.register(HolographicPattern(name='pattern', image_mask_roi=masks[i % 2].copy(),
+                                                      method=ps_method))
+            series = PhotostimulationSeries(name=f"series_{i}", format='interval', pattern=hp, data=[1, -1],
+                                            timestamps=[i, i + 0.5])
+            self.nwbfile.add_stimulus(series)
+
+        with NWBHDF5IO(self.path, "w") as io:
+            io.write(self.nwbfile)
+
+        with h5py.File(self.path, 'r') as f:
+            stored = []
+            f.visititems(lambda name, obj: stored.append(name) if name.endswith('image_mask_roi') else None)
+            assert len(stored) == 2
+
+        with NWBHDF5IO(self.path, mode='r', load_namespaces=True) as io:
+            stimulus = io.read().stimulus
+            patterns = [stimulus[f"series_{i}"].pattern for i in range(6)]
+            assert patterns[0] is patterns[2] is patterns[4]
+            assert patterns[1] is patterns[3] is patterns[5]
+            np.testing.assert_array_equal(patterns[3].image_mask_roi[:], masks[1])
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_roundtrip_shared_method(self):
+        """
+        Check that methods and devices from a MethodRegistry are written once and shared by the patterns read back.
+        """
+        registry = MethodRegistry()
+        for i in range(4):
+            slm = registry.get_slm(name='slm', model='Meadowlark', size=[512, 512])
+            laser = registry.get_laser(name='laser', model='Coherent', wavelength=1030)
+            method = registry.get_method(name='method', power_per_target=float(i % 2), slm=slm, laser=laser)
+            hp = HolographicPattern(name='pattern', pixel_roi=[[i, i]], roi_size=3, dimension=[16, 16],
+                                    method=method)
+            series = PhotostimulationSeries(name=f"series_{i}", format='interval', pattern=hp, data=[1, -1],
+                                            timestamps=[i, i + 0.5])
+            self.nwbfile.add_stimulus(series)
+
+        with NWBHDF5IO(self.path, "w") as io:
+            io.write(self.nwbfile)
+
+        with h5py.File(self.path, 'r') as f:
+            stored = []
+            f.visititems(lambda name, obj: stored.append(name) if name.endswith(('/slm', '/method')) else None)
+            assert len(stored) == 3
+
+        with NWBHDF5IO(self.path, mode='r', load_namespaces=True) as io:
+            stimulus = io.read().stimulus
+            methods = [stimulus[f"series_{i}"].pattern.method for i in range(4)]
+            assert methods[0] is methods[2] and methods[1] is methods[3] and methods[0] is not methods[1]
+            assert methods[0].slm is methods[1].slm
+            assert methods[1].power_per_target == 1.
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
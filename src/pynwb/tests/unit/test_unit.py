@@ -2,11 +2,24 @@ from datetime import datetime
 import numpy as np
 from ndx_photostim import SpatialLightModulator, Laser, PhotostimulationMethod, HolographicPattern, \
                              PhotostimulationSeries, PhotostimulationTable
-from pynwb import NWBFile
+from pynwb import NWBFile, TimeSeries
 from pynwb.testing import TestCase
+from hdmf.data_utils import DataChunkIterator
+from hdmf.spec.namespace import YAMLSpecReader
+import ndx_photostim
+from ndx_photostim.namespace_cache import CachedYAMLSpecReader
+from ndx_photostim import extract_peristim_windows, render_masks, Instrumentation, MethodRegistry, PatternRegistry
+from ndx_photostim.intervals import IntervalTree
+from ndx_photostim.search import RateTimestamps
+from ndx_photostim.storage import chunk_shape, wrap_dataset
 from dateutil.tz import tzlocal
 from pynwb import NWBFile, NWBHDF5IO
+import json
 import os
+import shutil
+import subprocess
+import sys
+import tempfile
 import matplotlib.pyplot as plt
 
 def get_SLM():
@@ -144,6 +157,138 @@ class TestHolographicPattern(TestCase):
         with self.assertRaises(TypeError):
             HolographicPattern(name='hp', pixel_roi=pixel_roi, roi_size=[8, 4], method=ps_method)
 
+    def test_pixel_to_image_mask_roi(self):
+        '''Test that the windowed rasterizer matches a full-frame rasterization, including ROIs on the edges.'''
+        ps_method = get_photostim_method()
+        pixel_roi = np.vstack([np.random.rand(50, 2) * 100, [[0, 0], [99, 99], [-3, 50], [50.5, 102.2]]])
+        Y, X = np.ogrid[:100, :100]
+
+        expected = np.zeros((100, 100))
+        for x, y in pixel_roi:
+            expected[np.sqrt((X - x) ** 2 + (Y - y) ** 2) <= 7 / 2] = 1
+        hp = HolographicPattern(name='hp', pixel_roi=pixel_roi, roi_size=7, dimension=[100, 100], method=ps_method)
+        np.testing.assert_array_equal(hp.pixel_to_image_mask_roi(), expected)
+        # the z coordinates of a 3-column pixel_roi are ignored for a 2D dimension
+        pixel_roi_3d = np.column_stack((pixel_roi, np.zeros(len(pixel_roi))))
+        hp = HolographicPattern(name='hp', pixel_roi=pixel_roi_3d, roi_size=7, dimension=[100, 100], method=ps_method)
+        np.testing.assert_array_equal(hp.pixel_to_image_mask_roi(), expected)
+
+        expected = np.zeros((100, 100))
+        for x, y in pixel_roi:
+            expected[(np.abs(X - x) <= 8 / 2) & (np.abs(Y - y) <= 3 / 2)] = 1
+        hp = HolographicPattern(name='hp', pixel_roi=pixel_roi, roi_size=[8, 3], dimension=[100, 100],
+                                method=ps_method)
+        np.testing.assert_array_equal(hp.pixel_to_image_mask_roi(), expected)
+
+    def test_pixel_to_image_mask_roi_3D(self):
+        '''Test rasterization of cylinder and cuboid ROIs for 3D 'pixel_roi' patterns.'''
+        ps_method = get_photostim_method()
+        pixel_roi = np.random.rand(20, 3) * [60, 60, 10]
+        Y, X, Z = np.ogrid[:60, :60, :10]
+
+        expected = np.zeros((60, 60, 10), dtype=bool)
+        for x, y, z in pixel_roi:
+            expected |= (np.sqrt((X - x) ** 2 + (Y - y) ** 2) <= 3) & (np.abs(Z - z) <= 3)
+        hp = HolographicPattern(name='hp', pixel_roi=pixel_roi, roi_size=6, dimension=[60, 60, 10], method=ps_method)
+        np.testing.assert_array_equal(hp.pixel_to_image_mask_roi(dtype=bool), expected)
+        for z, plane in hp.iter_mask_planes():
+            np.testing.assert_array_equal(plane, expected[:, :, z])
+
+        expected = np.zeros((60, 60, 10), dtype=bool)
+        for x, y, z in pixel_roi:
+            expected |= (np.abs(X - x) <= 4) & (np.abs(Y - y) <= 2) & (np.abs(Z - z) <= 1)
+        hp = HolographicPattern(name='hp', pixel_roi=pixel_roi, roi_size=[8, 4, 2], dimension=[60, 60, 10],
+                                method=ps_method)
+        np.testing.assert_array_equal(hp.pixel_to_image_mask_roi(), expected)
+
+        hp = HolographicPattern(name='hp', pixel_roi=pixel_roi, roi_size=[8, 4], dimension=[60, 60, 10],
+                                method=ps_method)
+        with self.assertRaises(ValueError):
+            hp.pixel_to_image_mask_roi()
+
+    def test_render_masks(self):
+        '''Test that masks rendered in a process pool match serial rasterization, in the order of the patterns.'''
+        ps_method = get_photostim_method()
+        patterns = [HolographicPattern(name='hp', pixel_roi=np.random.rand(20, 2) * 50, roi_size=5,
+                                       dimension=[50, 40], method=ps_method),
+                    HolographicPattern(name='hp', pixel_roi=np.random.rand(20, 3) * [30, 30, 5], roi_size=[4, 4, 2],
+                                       dimension=[30, 30, 5], method=ps_method)]
+        for workers in (1, 2):
+            masks = render_masks(patterns, workers=workers, dtype=np.uint8)
+            for pattern, mask in zip(patterns, masks):
+                assert mask.dtype == np.uint8
+                np.testing.assert_array_equal(mask, pattern.pixel_to_image_mask_roi(dtype=np.uint8))
+
+        with self.assertRaises(ValueError):
+            render_masks([get_holographic_pattern()])
+
+    def test_image_to_pixel(self):
+        '''Test conversion of 2D and 3D image masks to pixel lists and ROI centers.'''
+        image_mask = np.zeros((20, 30))
+        image_mask[2:5, 3:6] = 1
+        image_mask[10, 20] = 0.5
+
+        pixels = HolographicPattern.image_to_pixel(image_mask)
+        assert pixels.shape == (10, 3)
+        np.testing.assert_array_equal(pixels[0], [2, 3, 1])
+        np.testing.assert_array_equal(pixels[-1], [10, 20, 0.5])
+
+        np.testing.assert_array_equal(HolographicPattern.image_to_pixel(image_mask, centers=True), [[3, 4], [10, 20]])
+
+        volume = np.zeros((5, 5, 5), dtype=bool)
+        volume[1, 2, 3] = True
+        pixels = HolographicPattern.image_to_pixel(volume)
+        np.testing.assert_array_equal(pixels, [[1, 2, 3, 1]])
+        assert pixels.dtype.kind == 'i'
+
+    def test_sparse_mask_roi(self):
+        '''Test storing the mask of a HolographicPattern as 'sparse_mask_roi'.'''
+        ps_method = get_photostim_method()
+        image_mask_roi = self._create_image_mask_roi()
+        hp = HolographicPattern(name='hp', image_mask_roi=image_mask_roi, sparse=True, method=ps_method)
+        assert hp.image_mask_roi is None
+        assert hp.sparse_mask_roi.shape == (25, 3)
+        assert hp.dimension == (50, 50)
+        np.testing.assert_array_equal(hp.image_mask, image_mask_roi)
+
+        hp = HolographicPattern(name='hp', sparse_mask_roi=[[1, 2, 3, 1], [4, 0, 0, 1]], dimension=[5, 5, 5],
+                                method=ps_method)
+        assert hp.image_mask.shape == (5, 5, 5)
+        assert hp.image_mask.sum() == 2
+        assert hp.image_mask[1, 2, 3] == 1
+
+        with self.assertRaises(TypeError):
+            HolographicPattern(name='hp', sparse_mask_roi=[[1, 2, 1]], method=ps_method)
+
+    def test_image_mask_cache(self):
+        '''Test that 'image_mask' is cached and read-only, and recomputed once the cache is cleared.'''
+        ps_method = get_photostim_method()
+        pixel_roi = np.array([[10., 10.], [40., 20.]])
+        hp = HolographicPattern(name='hp', pixel_roi=pixel_roi, roi_size=5, dimension=[50, 50], method=ps_method)
+
+        mask = hp.image_mask
+        assert hp.image_mask is mask
+        np.testing.assert_array_equal(mask, hp.pixel_to_image_mask_roi())
+        with self.assertRaises(ValueError):
+            mask[0, 0] = 1
+
+        pixel_roi[0] = [30., 30.]
+        assert hp.image_mask is mask
+        hp.clear_mask_cache()
+        assert hp.image_mask is not mask
+        np.testing.assert_array_equal(hp.image_mask, hp.pixel_to_image_mask_roi())
+
+        hp = HolographicPattern(name='hp', pixel_roi=pixel_roi, roi_size=5, dimension=[50, 50], method=ps_method,
+                                mask_cache_max_bytes=100)
+        assert hp.image_mask is not hp.image_mask
+
+        image_mask_roi = self._create_image_mask_roi()
+        hp = HolographicPattern(name='hp', image_mask_roi=image_mask_roi, method=ps_method)
+        assert hp.image_mask.base is image_mask_roi
+        with self.assertRaises(ValueError):
+            hp.image_mask[0, 0] = 1
+        assert image_mask_roi.flags.writeable
+
     @staticmethod
     def _create_pixel_roi():
         '''Helper function to create pixel_roi at 5 randomly selected coordinates.'''
@@ -210,6 +355,100 @@ class TestPhotostimulationSeries(TestCase):
             PhotostimulationSeries(name="photosim series", pattern=hp, format='series',
                                data=[0, 0, 0, 1, 2, 0], rate=10.)
 
+    def test_validate(self):
+        '''Test that onset/offset alternation and timestamp order are checked, unless 'validate' is False.'''
+        hp = get_holographic_pattern()
+        PhotostimulationSeries(name="series", format='interval', pattern=hp, data=[1., -1., 1., -1.],
+                               timestamps=[0.5, 1, 1, 4])
+
+        invalid = [dict(format='interval', data=[1, 1, -1, -1], timestamps=[0.5, 1, 2, 4]),
+                   dict(format='interval', data=[-1, 1], timestamps=[0.5, 1]),
+                   dict(format='interval', data=[1, -1, 1, -1], timestamps=[0.5, 1, 0.8, 4]),
+                   dict(format='interval', data=[1, -1, 1, -0.5], timestamps=[0.5, 1, 2, 4]),
+                   dict(format='series', data=[0, 1, 0, 2], rate=10., stim_duration=0.1),
+                   dict(format='series', data=[0, 1, 0, 1], timestamps=[0, 2, 1, 3], stim_duration=0.1)]
+        for kwargs in invalid:
+            with self.assertRaises(ValueError):
+                PhotostimulationSeries(name="series", pattern=hp, **kwargs)
+
+        series = PhotostimulationSeries(name="series", pattern=hp, validate=False, **invalid[0])
+        np.testing.assert_array_equal(series.data, [1, 1, -1, -1])
+        # unvalidated values are not truncated to the integer dtype of the format
+        series = PhotostimulationSeries(name="series", pattern=hp, validate=False, **invalid[3])
+        np.testing.assert_array_equal(series.data, [1, -1, 1, -0.5])
+        with self.assertRaises(ValueError):
+            PhotostimulationSeries(name="series", format='interval', pattern=hp, data=[1, -1], timestamps=[0.5],
+                                   validate=False)
+
+    def test_intervals_format(self):
+        '''Test 'intervals' series holding one [start, stop] row per presentation, and conversion to 'interval'.'''
+        hp = get_holographic_pattern()
+        series = PhotostimulationSeries(name="series", format='intervals', pattern=hp, data=[[0.5, 1], [2, 4]],
+                                        stim_duration=0.5)
+        np.testing.assert_array_equal(series.timestamps, [0.5, 2])
+        series.add_interval(5., 6.)
+        series.add_onsets([7.])
+        np.testing.assert_array_equal(series.get_intervals(), [[0.5, 1], [2, 4], [5, 6], [7, 7.5]])
+        np.testing.assert_array_equal(series.to_dataframe()['stop_time'], [1, 4, 6, 7.5])
+        assert series._get_end_time() == 7.5
+
+        converted = series.convert_format('interval')
+        np.testing.assert_array_equal(converted.data, [1, -1] * 4)
+        np.testing.assert_array_equal(converted.timestamps, [0.5, 1, 2, 4, 5, 6, 7, 7.5])
+        np.testing.assert_array_equal(converted.convert_format('intervals').data, series.data)
+        np.testing.assert_array_equal(series.slice_time(3., 6.).data, [[2, 4], [5, 6]])
+        np.testing.assert_array_equal(series.slice_time(4., 4.5).data, np.empty((0, 2)))
+
+        for data in ([[0.5, 1], [0.8, 4]], [[1, 0.5]], [0.5, 1]):
+            with self.assertRaises(ValueError):
+                PhotostimulationSeries(name="series", format='intervals', pattern=hp, data=data)
+        with self.assertRaises(ValueError):
+            PhotostimulationSeries(name="series", format='interval', pattern=hp, data=[-1, 1, -1, 1],
+                                   timestamps=[0.4, 0.9, 1.9, 3.9])
+        with self.assertRaises(ValueError):
+            PhotostimulationSeries(name="series", format='interval', pattern=hp, data=[-1, 1, -1, 1],
+                                   timestamps=[0.4, 0.9, 1.9, 3.9], validate=False).convert_format('intervals')
+
+    def test_events_format(self):
+        '''Test 'series' data stored sparsely as 'events', and conversion between 'series' and 'events'.'''
+        hp = get_holographic_pattern()
+        dense = np.zeros(100, dtype=np.int8)
+        dense[[3, 40, 41, 97]] = 1
+        series = PhotostimulationSeries(name="series", format='series', pattern=hp, data=dense, rate=10.,
+                                        starting_time=2., stim_duration=0.05, sparse=True)
+        assert series.format == 'events'
+        assert series.dense_length == 100 and series.num_samples == 100
+        np.testing.assert_array_equal(series.data, [3, 40, 41, 97])
+        np.testing.assert_array_equal(series.dense_data, dense)
+        np.testing.assert_allclose(series.get_intervals()[:, 0], [2.3, 6, 6.1, 11.7])
+        np.testing.assert_array_equal(series.to_dataframe()['data'], [1, 1, 1, 1])
+        assert np.isclose(series._get_end_time(), 11.9)
+
+        sliced = series.slice_time(6., 10.)
+        np.testing.assert_array_equal(sliced.dense_data, dense[40:80])
+        assert sliced.starting_time == 6.
+
+        converted = series.convert_format('series')
+        assert converted.format == 'series' and converted.rate == 10.
+        np.testing.assert_array_equal(converted.data, dense)
+        np.testing.assert_array_equal(converted.convert_format('events').data, series.data)
+
+        sp_table = PhotostimulationTable(name='test', description='test table')
+        sp_table.add_series(series)
+        assert sp_table['series_format'][0] == 'events'
+
+        for data in ([3, 3], [5, 2], [0.5], [100]):
+            with self.assertRaises(ValueError):
+                PhotostimulationSeries(name="series", format='events', pattern=hp, data=data, rate=10.,
+                                       dense_length=100, stim_duration=0.05)
+        with self.assertRaises(ValueError):
+            PhotostimulationSeries(name="series", format='events', pattern=hp, data=[3], rate=10., stim_duration=0.05)
+        with self.assertRaises(ValueError):
+            PhotostimulationSeries(name="series", format='series', pattern=hp, data=[0, 1], timestamps=[0., 1.],
+                                   stim_duration=0.05, sparse=True)
+        with self.assertRaises(ValueError):
+            series.convert_format('interval')
+
     def test_add_interval(self):
         '''Test 'add_interval' method on 'interval' type series.'''
         hp = get_holographic_pattern()
@@ -247,6 +486,107 @@ class TestPhotostimulationSeries(TestCase):
         assert all(ps.timestamps == np.array([10., 12., 30., 32., 40., 42., 50., 52.]))
         assert all(ps.data == np.array([ 1., -1.,  1., -1.,  1., -1.,  1., -1.]))
 
+    def test_bulk_add(self):
+        '''Test 'add_onsets' and 'add_intervals' add all presentations at once, matching the single-event methods.'''
+        hp = get_holographic_pattern()
+        onsets = np.arange(1000) * 3.
+
+        ps = PhotostimulationSeries(name="photosim series", format='interval', pattern=hp, stim_duration=2)
+        ps.add_onsets(onsets)
+        expected = PhotostimulationSeries(name="photosim series", format='interval', pattern=hp, stim_duration=2)
+        for onset in onsets:
+            expected.add_interval(onset, onset + 2)
+        np.testing.assert_array_equal(ps.data, expected.data)
+        np.testing.assert_array_equal(ps.timestamps, expected.timestamps)
+
+        ps = PhotostimulationSeries(name="photosim series", format='interval', pattern=hp)
+        ps.add_intervals(onsets, onsets + 2)
+        np.testing.assert_array_equal(ps.timestamps, expected.timestamps)
+        with self.assertRaises(ValueError):
+            ps.add_intervals([1., 2.], [3.])
+
+        # added presentations must be in time order, after the last one, and stop after they start
+        for starts, stops in (([5000., 4000.], [5001., 4001.]), ([10.], [11.]), ([5000.], [4999.])):
+            with self.assertRaises(ValueError):
+                ps.add_intervals(starts, stops)
+        with self.assertRaises(ValueError):
+            expected.add_onsets([5000., 5000.5])
+        ps = PhotostimulationSeries(name="photosim series", format='intervals', pattern=hp, data=[[0., 2.]])
+        with self.assertRaises(ValueError):
+            ps.add_interval(1., 3.)
+        with self.assertRaises(ValueError):
+            ps.add_interval(5., 2.)
+        assert len(ps.data) == 1
+
+        ps = PhotostimulationSeries(name="photosim series", format='series', pattern=hp, stim_duration=2)
+        ps.add_onsets(onsets)
+        np.testing.assert_array_equal(ps.timestamps, onsets)
+        assert all(ps.data == 1)
+        with self.assertRaises(ValueError):
+            ps.add_intervals(onsets, onsets + 2)
+
+    def test_typed_buffers(self):
+        '''Test that 'data' and 'timestamps' are typed numpy views that grow as presentations are added.'''
+        hp = get_holographic_pattern()
+        ps = PhotostimulationSeries(name="photosim series", format='interval', pattern=hp, data=np.array([1, -1]),
+                                    timestamps=np.array([0, 1]))
+        assert ps.data.dtype == np.int8
+        assert ps.timestamps.dtype == np.float64
+        assert np.shares_memory(ps.data, ps.data)
+
+        for i in range(1, 1000):
+            ps.add_interval(2. * i, 2. * i + 1)
+        assert len(ps.data) == 2000
+        assert ps.num_samples == 2000
+        np.testing.assert_array_equal(ps.data[-2:], [1, -1])
+        np.testing.assert_array_equal(ps.timestamps[-2:], [1998., 1999.])
+
+    def test_streamed_data(self):
+        '''Test that streamed 'data' is validated chunk by chunk, and its length checked against 'timestamps'.'''
+        hp = get_holographic_pattern()
+        ps = PhotostimulationSeries(name="photosim series", format='interval', pattern=hp,
+                                    data=DataChunkIterator(data=iter([1, -1, 1, -1]), buffer_size=2),
+                                    timestamps=[0., 1., 2., 3.])
+        self.assertEqual([chunk.data.tolist() for chunk in ps.data], [[1, -1], [1, -1]])
+
+        ps = PhotostimulationSeries(name="photosim series", format='series', pattern=hp, stim_duration=0.5,
+                                    data=DataChunkIterator(data=iter([0, 1, 2]), buffer_size=2), rate=10.)
+        with self.assertRaises(ValueError):
+            list(ps.data)
+
+        ps = PhotostimulationSeries(name="photosim series", format='interval', pattern=hp,
+                                    data=DataChunkIterator(data=iter([1, -1, 1, -1])),
+                                    timestamps=DataChunkIterator(data=iter([0., 1., 2.])))
+        list(ps.timestamps)
+        with self.assertRaises(ValueError):
+            list(ps.data)
+
+        with self.assertRaises(ValueError):
+            PhotostimulationSeries(name="photosim series", format='interval', pattern=hp,
+                                   data=DataChunkIterator(data=iter([1, -1])))
+
+        # onsets and offsets must alternate, and timestamps increase, across chunks
+        ps = PhotostimulationSeries(name="photosim series", format='interval', pattern=hp,
+                                    data=DataChunkIterator(data=iter([1, 1, -1, -1]), buffer_size=1),
+                                    timestamps=DataChunkIterator(data=iter([0., 2., 1., 3.]), buffer_size=2))
+        with self.assertRaises(ValueError):
+            list(ps.data)
+        with self.assertRaises(ValueError):
+            list(ps.timestamps)
+        ps = PhotostimulationSeries(name="photosim series", format='interval', pattern=hp,
+                                    data=DataChunkIterator(data=iter([-1, 1])), timestamps=[0., 1.])
+        with self.assertRaises(ValueError):
+            list(ps.data)
+        with self.assertRaises(ValueError):
+            PhotostimulationSeries(name="photosim series", format='interval', pattern=hp,
+                                   data=DataChunkIterator(data=iter([1, -1])), timestamps=[1., 0.])
+
+        sp = PhotostimulationTable(name='test table', description='test table description')
+        with self.assertRaises(ValueError):
+            sp.add_series(PhotostimulationSeries(name="photosim series", format='series', pattern=hp,
+                                                 stim_duration=0.5, data=DataChunkIterator(data=iter([0, 1])),
+                                                 rate=10.))
+
     def test_to_df(self):
         '''Test conversion to Pandas dataframe, showing data and timestamps in each columns.'''
         hp = get_holographic_pattern()
@@ -279,6 +619,78 @@ class TestPhotostimulationSeries(TestCase):
                                                   data=[0, 0, 0, 1, 1, 0], timestamps=[0, 0.5, 1, 1.5, 3, 6])
         ps._get_start_stop_list()
 
+    def test_get_intervals(self):
+        '''Test 'get_intervals' returns the start and stop times of each presentation for each format.'''
+        hp = get_holographic_pattern()
+        ps = PhotostimulationSeries(name="photosim series", format='interval', pattern=hp, data=[1, -1, 1, -1],
+                                    timestamps=[0.5, 1, 2, 4])
+        np.testing.assert_array_equal(ps.get_intervals(), [[0.5, 1], [2, 4]])
+        assert ps._get_start_stop_list() == [(0.5, 1.), (2., 4.)]
+
+        ps = PhotostimulationSeries(name="photosim series", pattern=hp, format='series',
+                                    data=[0, 0, 0, 1, 1, 0], rate=10., stim_duration=4)
+        np.testing.assert_allclose(ps.get_intervals(), [[0.3, 4.3], [0.4, 4.4]])
+
+        ps = PhotostimulationSeries(name="photosim series", pattern=hp, format='series', stim_duration=0.05,
+                                    data=[0, 0, 0, 1, 1, 0], timestamps=[0, 0.5, 1, 1.5, 3, 6])
+        np.testing.assert_allclose(ps.get_intervals(), [[1.5, 1.55], [3, 3.05]])
+
+        ps = PhotostimulationSeries(name="photosim series", format='interval', pattern=hp)
+        assert ps.get_intervals().shape == (0, 2)
+
+    def test_time_window(self):
+        '''Test that the entries in a time window are found by binary search.'''
+        hp = get_holographic_pattern()
+        ps = PhotostimulationSeries(name="photosim series", format='interval', pattern=hp, stim_duration=0.5)
+        ps.add_onsets(np.arange(10.))
+
+        data, timestamps = ps.get_events(2., 4.)
+        np.testing.assert_array_equal(data, [1, -1, 1, -1])
+        np.testing.assert_array_equal(timestamps, [2., 2.5, 3., 3.5])
+        assert np.shares_memory(timestamps, ps.timestamps)
+        assert len(ps.get_events(20., 30.)[0]) == 0
+
+        # intervals crossing the edges of the window are kept complete
+        window = ps.slice_time(2.25, 3.25, name='window')
+        assert window.name == 'window' and window.pattern is hp
+        np.testing.assert_array_equal(window.data, [1, -1, 1, -1])
+        np.testing.assert_array_equal(window.timestamps, [2., 2.5, 3., 3.5])
+        np.testing.assert_array_equal(ps.slice_time(2.1, 2.2).timestamps, [2., 2.5])
+
+        ps = PhotostimulationSeries(name="photosim series", format='series', pattern=hp, data=[0, 1, 0, 1, 1],
+                                    rate=10., starting_time=1., stim_duration=0.05)
+        data, timestamps = ps.get_events(1.1, 1.3)
+        np.testing.assert_array_equal(data, [1, 0])
+        np.testing.assert_allclose(timestamps, [1.1, 1.2])
+        window = ps.slice_time(1.1, 1.3)
+        assert window.starting_time == 1.1 and window.rate == 10.
+        np.testing.assert_allclose(window.get_intervals(), [[1.1, 1.15]])
+
+    def test_rate_timestamps(self):
+        '''Test that rate-based series compute their timestamps lazily, and their start and end times.'''
+        hp = get_holographic_pattern()
+        ps = PhotostimulationSeries(name="photosim series", format='series', pattern=hp, data=[0, 1, 0, 1, 1] * 2000,
+                                    rate=30000., starting_time=2., stim_duration=0.001)
+        assert ps.timestamps is None
+        timestamps = ps.get_timestamps()
+        assert isinstance(timestamps, RateTimestamps) and len(timestamps) == 10000
+        assert timestamps[0] == 2. and timestamps[-1] == 2. + 9999 / 30000.
+        np.testing.assert_allclose(timestamps[10:13], 2. + np.arange(10, 13) / 30000.)
+        np.testing.assert_allclose(timestamps[[1, 3]], 2. + np.array([1, 3]) / 30000.)
+        assert timestamps.searchsorted(2. + 10 / 30000.) == 10
+        assert timestamps.searchsorted(2. + 10 / 30000., side='right') == 11
+        with self.assertRaises(IndexError):
+            timestamps[10000]
+
+        np.testing.assert_allclose(ps.to_dataframe()['timestamps'], np.asarray(timestamps))
+        assert ps._get_start_time() == 2.
+        assert ps._get_end_time() == 2. + 9999 / 30000.
+
+        ps = PhotostimulationSeries(name="photosim series", format='series', pattern=hp, data=[0, 1, 1],
+                                    timestamps=[0.5, 1., 3.], stim_duration=0.1)
+        assert ps._get_start_time() == 0.5
+        assert ps._get_end_time() == 3.
+
 class TestPhotostimulationTable(TestCase):
     def test_init(self):
         '''Test PhotostimulationTable initialization.'''
@@ -291,7 +703,7 @@ class TestPhotostimulationTable(TestCase):
         s1 = get_series()
         s2 = PhotostimulationSeries(name="series_2",
                                     format='interval',
-                                    data=[-1, 1, -1, 1],
+                                    data=[1, -1, 1, -1],
                                     timestamps=[0.4, 0.9, 1.9, 3.9],
                                     pattern=hp)
         s3 = PhotostimulationSeries(name="series_3",
@@ -313,6 +725,59 @@ class TestPhotostimulationTable(TestCase):
         with NWBHDF5IO(self.path, "w") as io:
             io.write(nwbfile)
 
+    def test_add_series_bulk(self):
+        '''Test adding many series at once, and across several calls.'''
+        hp = get_holographic_pattern()
+        series = []
+        for i in range(100):
+            s = PhotostimulationSeries(name=f"series_{i}", format='interval', pattern=hp, stim_duration=1)
+            s.add_onsets(np.arange(i + 1) * 10. + i)
+            series.append(s)
+
+        sp = PhotostimulationTable(name='test', description='test desc')
+        sp.add_series(series[:60])
+        sp.add_series(series[60:], row_name=[f"row_{i}" for i in range(60, 100)])
+        sp.add_series(series[0], row_name="single_row")
+
+        assert len(sp) == 101
+        assert list(sp.id.data) == list(range(101))
+        assert sp['row_name'][59] == 'series_59'
+        assert sp['row_name'][60] == 'row_60'
+        assert sp['row_name'][100] == 'single_row'
+        assert sp['series'][99] is series[99]
+        assert sp['num_samples'][99] == 200
+        assert sp['stop_time'][99] == 990 + 99 + 1
+        assert sp['method_name'][0] == 'methodA'
+        assert sp.to_dataframe().shape == (101, 9)
+
+        s = PhotostimulationSeries(name="empty", format='interval', pattern=hp)
+        with self.assertRaises(ValueError):
+            sp.add_series([series[0], s])
+        assert len(sp) == 101
+
+    def test_interval_index(self):
+        '''Test point and range queries for the rows presenting their stimulus, before and after adding rows.'''
+        hp = get_holographic_pattern()
+        ps_1 = PhotostimulationSeries(name="series_1", format='interval', pattern=hp, data=[1, -1, 1, -1],
+                                      timestamps=[0., 2., 5., 6.])
+        ps_2 = PhotostimulationSeries(name="series_2", format='series', pattern=hp, data=[0, 1, 0, 1],
+                                      rate=1., stim_duration=0.5)
+
+        sp = PhotostimulationTable(name='test', description='test desc')
+        sp.add_series([ps_1, ps_2])
+        np.testing.assert_array_equal(sp.get_rows_at(1.), [0, 1])
+        np.testing.assert_array_equal(sp.get_rows_at(2.), [])
+        np.testing.assert_array_equal(sp.get_rows_at(3.25), [1])
+        np.testing.assert_array_equal(sp.get_rows_overlapping(1.5, 3.), [0])
+        np.testing.assert_array_equal(sp.get_rows_overlapping(2., 5.), [1])
+        assert sp[sp.get_rows_at(5.5)].shape == (1, 9)
+
+        ps_3 = PhotostimulationSeries(name="series_3", format='interval', pattern=hp, data=[1, -1],
+                                      timestamps=[1.75, 2.25])
+        sp.add_series(ps_3, row_name="row_3")
+        np.testing.assert_array_equal(sp.get_rows_at(2.), [2])
+        np.testing.assert_array_equal(sp.get_rows_overlapping(0., 10.), [0, 1, 2])
+
     def test_plot_presentation_times(self):
         '''Check that PhotostimulationTable can be plotted correctly.'''
         ps_method = get_photostim_method()
@@ -324,7 +789,7 @@ class TestPhotostimulationTable(TestCase):
         s1 = get_series()
         s2 = PhotostimulationSeries(name="series_2",
                                     format='interval',
-                                    data=[-1, 1, -1, 1],
+                                    data=[1, -1, 1, -1],
                                     timestamps=[0.4, 0.9, 1.9, 3.9],
                                     pattern=hp)
         s3 = PhotostimulationSeries(name="series_3",
@@ -339,3 +804,218 @@ class TestPhotostimulationTable(TestCase):
 
         ax = sp.plot_presentation_times(xlim=[0, 2])
         plt.show()
+
+
+class TestIntervalTree(TestCase):
+    def test_queries(self):
+        '''Test the interval tree against a linear scan of random intervals.'''
+        rng = np.random.default_rng(0)
+        starts = rng.uniform(0, 100, 5000)
+        stops = starts + rng.exponential(1., 5000)
+        labels = rng.integers(0, 20, 5000)
+        tree = IntervalTree(starts, stops, labels)
+        assert len(tree) == 5000
+
+        for t in np.concatenate((rng.uniform(-1, 101, 100), starts[:50], stops[:50])):
+            np.testing.assert_array_equal(tree.stab(t), np.unique(labels[(starts <= t) & (t < stops)]))
+            np.testing.assert_array_equal(tree.overlap(t, t + 0.5),
+                                          np.unique(labels[(starts < t + 0.5) & (stops > t)]))
+        assert len(tree.overlap(5., 5.)) == 0
+        assert len(IntervalTree([], [], []).stab(0.)) == 0
+
+        # with two disjoint clusters, the median endpoint falls in the gap and the root holds no interval
+        starts = np.concatenate((np.arange(40.), np.arange(40.) + 100))
+        tree = IntervalTree(starts, starts + 0.5, np.arange(80))
+        assert len(tree.root.starts) == 0
+        np.testing.assert_array_equal(tree.stab(39.25), [39])
+        np.testing.assert_array_equal(tree.stab(110.), [50])
+        np.testing.assert_array_equal(tree.overlap(39., 101.), [39, 40])
+        assert len(tree.stab(70.)) == 0
+
+
+class TestPeristimWindows(TestCase):
+    def test_extract_peristim_windows(self):
+        '''Test that windows around each onset are gathered from the response, with NaN outside of it.'''
+        hp = get_holographic_pattern()
+        ps = PhotostimulationSeries(name="photosim series", format='interval', pattern=hp, stim_duration=0.1)
+        ps.add_onsets([0.05, 1., 4.95])
+        data = np.arange(50 * 2, dtype=np.int32).reshape(50, 2)
+
+        for response in (TimeSeries(name='response', data=data, unit='a.u.', rate=10.),
+                         TimeSeries(name='response', data=data, unit='a.u.', timestamps=np.arange(50) / 10.)):
+            windows, times = extract_peristim_windows(ps, response, 0.2, 0.3)
+            assert windows.shape == (3, 5, 2) and windows.dtype == np.float64
+            np.testing.assert_allclose(times, [-0.2, -0.1, 0., 0.1, 0.2])
+            # onsets are aligned to frames 1, 10 and 50 (after the last frame)
+            np.testing.assert_array_equal(windows[0, :, 0], [np.nan, 0, 2, 4, 6])
+            np.testing.assert_array_equal(windows[1, :, 1], [17, 19, 21, 23, 25])
+            np.testing.assert_array_equal(windows[2, :, 0], [96, 98, np.nan, np.nan, np.nan])
+
+
+class TestPatternRegistry(TestCase):
+    def test_content_hash(self):
+        '''Test that patterns are hashed by content, including their method, but not by name.'''
+        mask = np.round(np.random.rand(20, 20))
+        hp = HolographicPattern(name='pattern', image_mask_roi=mask, method=get_photostim_method())
+        same = HolographicPattern(name='other', image_mask_roi=mask.astype(int), method=get_photostim_method())
+        assert hp.content_hash() == same.content_hash()
+
+        other_mask = HolographicPattern(name='pattern', image_mask_roi=1 - mask, method=get_photostim_method())
+        other_method = HolographicPattern(name='pattern', image_mask_roi=mask, method=PhotostimulationMethod(name='m'))
+        other_duration = HolographicPattern(name='pattern', image_mask_roi=mask, method=get_photostim_method(),
+                                            stim_duration=0.1)
+        hashes = {hp.content_hash(), other_mask.content_hash(), other_method.content_hash(),
+                  other_duration.content_hash()}
+        assert len(hashes) == 4
+
+    def test_register(self):
+        '''Test that patterns with the same content are resolved to the first one registered.'''
+        registry = PatternRegistry()
+        mask = np.round(np.random.rand(20, 20))
+        patterns = [registry.register(HolographicPattern(name='pattern', image_mask_roi=m.copy(),
+                                                         method=get_photostim_method()))
+                    for m in (mask, 1 - mask, mask)]
+        assert len(registry) == 2
+        assert patterns[0] is patterns[2] and patterns[0] is not patterns[1]
+        assert patterns[1] in registry
+        assert list(registry) == patterns[:2]
+
+
+class TestMethodRegistry(TestCase):
+    def test_get(self):
+        '''Test that devices and methods are created once per distinct field values.'''
+        registry = MethodRegistry()
+        slm = registry.get_slm(name='slm', model='Meadowlark', size=[512, 512])
+        assert registry.get_slm(name='other', model='Meadowlark', size=[512, 512]) is slm
+        assert registry.get_slm(name='slm', model='Meadowlark') is not slm
+        laser = registry.get_laser(name='laser', model='Coherent', wavelength=1030)
+
+        method = registry.get_method(name='method', power_per_target=8., slm=slm, laser=laser)
+        same = registry.get_method(name='method', power_per_target=8., slm=slm,
+                                   laser=Laser(name='laser', model='Coherent', wavelength=1030))
+        assert same is method
+        other = registry.get_method(name='method', power_per_target=4., slm=slm, laser=laser)
+        assert other is not method and other.slm is method.slm
+        assert len(registry) == 5
+
+    def test_register(self):
+        '''Test that constructed methods are resolved to registered methods and devices.'''
+        registry = MethodRegistry()
+        method = registry.register(get_photostim_method())
+        assert registry.register(get_photostim_method()) is method
+        assert method in registry and method.slm in registry and method.laser in registry
+
+        other_method = PhotostimulationMethod(name="methodA", power_per_target=4., slm=get_SLM(), laser=get_laser())
+        registered = registry.register(other_method)
+        assert registered is not other_method
+        assert registered.slm is method.slm and registered.laser is method.laser
+        assert registered.power_per_target == 4.
+
+
+class TestInstrumentation(TestCase):
+    def test_instrumentation(self):
+        '''Test that calls are recorded only while the instrumentation is enabled.'''
+        original = PhotostimulationSeries.get_intervals
+        with Instrumentation() as instrumentation:
+            assert PhotostimulationSeries.get_intervals is not original
+            series = get_series()
+            series.get_intervals()
+            series.get_intervals()
+            HolographicPattern.image_to_pixel(series.pattern.image_mask_roi)
+        assert PhotostimulationSeries.get_intervals is original
+        series.get_intervals()
+
+        report = instrumentation.report()
+        assert report['PhotostimulationSeries.get_intervals']['calls'] == 2
+        assert report['PhotostimulationSeries.__init__']['calls'] == 1
+        assert report['HolographicPattern.image_to_pixel']['calls'] == 1
+        assert report['HolographicPattern.image_to_pixel']['allocated_bytes'] > 0
+        assert list(report) == sorted(report, key=lambda key: report[key]['wall_time'], reverse=True)
+        assert json.loads(instrumentation.to_json()) == report
+
+    def test_single_instrumentation(self):
+        '''Test that only one instrumentation can be enabled at a time.'''
+        with Instrumentation(trace_memory=False) as instrumentation:
+            with self.assertRaises(ValueError):
+                Instrumentation().enable()
+            get_series().get_intervals()
+        assert instrumentation.report()['PhotostimulationSeries.get_intervals']['allocated_bytes'] == 0
+
+
+class TestImport(TestCase):
+    def test_import_lazy_plotting(self):
+        '''Check that importing ndx_photostim does not load matplotlib (the import time is benchmarked in
+        benchmarks/benchmark_import.py).'''
+        code = "import sys; import ndx_photostim; print('matplotlib' in sys.modules)"
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                env={**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)}).stdout.split()
+
+        assert output[-1] == 'False'
+
+
+class TestNamespaceCache(TestCase):
+    def setUp(self):
+        self.spec_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.spec_dir, 'cache')
+        for ext in ('namespace', 'extensions'):
+            shutil.copy(os.path.join(os.path.dirname(ndx_photostim.ndx_photostim_specpath),
+                                     f'ndx-photostim.{ext}.yaml'), self.spec_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.spec_dir)
+
+    def test_cached_reader(self):
+        '''Test that parsed spec files are cached, and re-parsed when the spec file changes.'''
+        spec_path = os.path.join(self.spec_dir, 'ndx-photostim.extensions.yaml')
+        expected = YAMLSpecReader(indir=self.spec_dir).read_spec(spec_path)
+
+        reader = CachedYAMLSpecReader(indir=self.spec_dir, cache_dir=self.cache_dir)
+        assert reader.read_spec(spec_path) == expected
+        assert len(os.listdir(self.cache_dir)) == 1
+        assert reader.read_spec(spec_path) == expected
+        ns_path = os.path.join(self.spec_dir, 'ndx-photostim.namespace.yaml')
+        assert reader.read_namespace(ns_path) == YAMLSpecReader(indir=self.spec_dir).read_namespace(ns_path)
+
+        with open(spec_path, 'a') as f:
+            f.write("- neurodata_type_def: NewType\n  neurodata_type_inc: NWBContainer\n  doc: new type\n")
+        spec = reader.read_spec(spec_path)
+        assert spec['groups'][-1]['neurodata_type_def'] == 'NewType'
+        assert len(os.listdir(self.cache_dir)) == 3
+
+    def test_uncached_import(self):
+        '''Test that the classes are registered when the namespace is loaded without the cache.'''
+        code = ("import pynwb, ndx_photostim; "
+                "print(pynwb.get_class('PhotostimulationSeries', 'ndx-photostim') is "
+                "ndx_photostim.PhotostimulationSeries)")
+        env = {**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path), 'NDX_PHOTOSTIM_NO_SPEC_CACHE': '1',
+               'NDX_PHOTOSTIM_CACHE_DIR': self.cache_dir}
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                env=env).stdout.split()
+
+        assert output[-1] == 'True'
+        assert not os.path.exists(self.cache_dir)
+
+
+class TestStorage(TestCase):
+    def test_chunk_shape(self):
+        '''Test that chunk shapes are derived from the dataset size and the target chunk size.'''
+        assert chunk_shape((1000,), 8, 2 ** 20) == (1000,)
+        assert chunk_shape((10 ** 6,), 8, 2 ** 14) == (2048,)
+        assert chunk_shape((None,), 8, 2 ** 14) == (2048,)
+        assert chunk_shape((512, 512, 10), 8, 2 ** 20, plane_axis=2) == (256, 512, 1)
+        assert chunk_shape((5000, 3), 8, 2 ** 10) == (42, 3)
+
+    def test_wrap_dataset(self):
+        '''Test that data are wrapped with the settings of the storage profile.'''
+        data = np.zeros(100)
+        assert wrap_dataset(data, None) is data
+        assert wrap_dataset(np.zeros(0), 'archive').size == 0
+
+        data_io = wrap_dataset(data, 'archive')
+        assert data_io.io_settings == {'compression': 'gzip', 'compression_opts': 6, 'shuffle': True,
+                                       'chunks': (100,)}
+        assert wrap_dataset(data, 'fast').io_settings['compression'] == 'lzf'
+
+        with self.assertRaises(ValueError):
+            HolographicPattern(name='pattern', image_mask_roi=np.round(np.random.rand(5, 5)),
+                               method=PhotostimulationMethod(name="method"), storage_profile='zip')
@@ -222,6 +222,17 @@ def main():
                 # attributes=[
                 #     roi_size
                 # ]
+            ),
+            NWBDatasetSpec(
+                name='sparse_mask_roi',
+                doc=("ROIs designated as a sparse list of the pixels ([x, y, weight]) or voxels ([x, y, z, weight]) "
+                     "of the mask with a non-zero value, where x, y (and z) index the axes of a mask of size "
+                     "'dimension', and pixels that are not listed have a value of 0. Compact alternative to "
+                     "'image_mask_roi' for masks in which few pixels are stimulated."),
+                dtype='numeric',
+                dims=(('num_pixels', 'x_y_weight'), ('num_voxels', 'x_y_z_weight')),
+                shape=((None, 3), (None, 4)),
+                quantity='?'
             )
         ],
         groups=[
@@ -239,7 +250,8 @@ def main():
             stim_duration,
             NWBAttributeSpec(
                 name='format',
-                doc=("Format of data denoting stimulus presentation. Can be either 'interval' or 'series'."),
+                doc=("Format of data denoting stimulus presentation. Can be 'interval', 'intervals', 'series' or "
+                     "'events'."),
                 dtype='text',
                 required=True
             ),
@@ -248,6 +260,29 @@ def main():
                 doc=("Length of each epoch (in seconds)."),
                 dtype='numeric',
                 required=False
+            ),
+            NWBAttributeSpec(
+                name='dense_length',
+                doc=("Number of samples of the dense 0/1 'series' data encoded by 'events' data. Required if "
+                     "format is 'events'."),
+                dtype='int',
+                required=False
+            )
+        ],
+        datasets=[
+            NWBDatasetSpec(
+                name='data',
+                doc=("Stimulus presentations. If format is 'interval', a 1D array of onsets (1) and offsets (-1) at "
+                     "the corresponding 'timestamps'. If format is 'series', a 1D array of binary values (0 or 1) "
+                     "indicating whether the stimulus was presented at each timestamp. If format is 'intervals', "
+                     "a 2D array with the start and stop time (in seconds) of each presentation, one row per "
+                     "presentation. 'timestamps' are not stored for 'intervals' data, since they are the start "
+                     "times in the first column. If format is 'events', a 1D array with "
+                     "the increasing indices of the samples with a value of 1 of uniformly sampled 'series' data of "
+                     "'dense_length' samples, where sample i is at time 'starting_time + i / rate'."),
+                dtype='numeric',
+                dims=(('num_times',), ('num_intervals', 'start_stop')),
+                shape=((None,), (None, 2))
             )
         ],
         groups=[